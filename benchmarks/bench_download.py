@@ -0,0 +1,250 @@
+# bench_download.py
+# End-to-end benchmark of the GUI download path, offline: the format dialog's
+# fetch_formats + enhance_formats_with_audio, then download_video -> DownloadQueue
+# -> DownloadWorker -> run_download, against media_server.py and the stub
+# extractor in yt_dlp_plugins/. Also times enhance_formats_with_audio on the
+# stub's format lists.
+#
+#   python benchmarks/bench_download.py [--kinds progressive hls] [--sizes-mib 1 16] [--jobs 6]
+#                                       [--workers 3] [--latency-ms 0] [--json results.json]
+#
+# Per scenario it reports throughput over all jobs, time to first byte (worker
+# start until the server sends the first media byte), per-job overhead (worker
+# time not spent transferring) and CPU seconds of this process per MiB. The
+# media server runs in its own process so its CPU time is not counted.
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+# src for the app, this folder for media_server and the yt_dlp_plugins stub extractor
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+sys.path.insert(0, BENCH_DIR)
+
+
+DEFAULT_KINDS = ('progressive', 'hls')
+DEFAULT_SIZES_MIB = (1, 16)
+DEFAULT_JOBS = 6
+DEFAULT_WORKERS = 3
+ENHANCE_REPEAT = 2000
+MIB = 1024 * 1024
+
+
+def start_media_server(log_path, latency_ms=0.0):
+    """
+    Start media_server.py in a child process.
+
+    :return: (Popen, base URL)
+    """
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, 'media_server.py'), '--latency-ms', str(latency_ms),
+         '--log', log_path],
+        stdout=subprocess.PIPE, text=True
+    )
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError("The media server did not start")
+    return process, base_url
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_scenario(window, base_url, log_path, kind, size, jobs, run_id):
+    """
+    Download jobs videos of size bytes through the main window and measure them.
+
+    :return: Result dict for the scenario
+    """
+    from PyQt5.QtCore import QEventLoop
+    from downloader_core import fetch_formats, enhance_formats_with_audio
+    from yt_dlp_plugins.extractor.bench_stub import BENCH_FORMATS
+
+    video_ids = [f"{run_id}-{kind}-{size}-{i}" for i in range(jobs)]
+    urls = {video_id: f"{base_url}/watch/{kind}/{size}/{video_id}" for video_id in video_ids}
+
+    # What show_format_selection does before the user picks a format
+    extract_started = time.perf_counter()
+    selected = {}
+    for video_id, url in urls.items():
+        formats = enhance_formats_with_audio(fetch_formats(url))
+        selected[video_id] = next(fmt for fmt in formats if fmt['format_id'] == BENCH_FORMATS[kind])
+    extract_seconds = (time.perf_counter() - extract_started) / jobs
+
+    started, finished, failed = {}, {}, {}
+    loop = QEventLoop()
+    queue = window.download_queue
+
+    def video_id_of(job):
+        return job.url.rsplit('/', 1)[-1]
+
+    def on_done(job, error=None):
+        (failed if error else finished)[video_id_of(job)] = time.time()
+        if len(finished) + len(failed) == jobs:
+            loop.quit()
+
+    connections = [
+        (queue.job_started, lambda job: started.setdefault(video_id_of(job), time.time())),
+        (queue.job_finished, on_done),
+        (queue.job_failed, on_done),
+    ]
+    for signal, slot in connections:
+        signal.connect(slot)
+
+    log_offset = os.path.getsize(log_path)
+    cpu_before = cpu_seconds()
+    submitted = time.time()
+    for video_id, url in urls.items():
+        window.url_input.setText(url)
+        window.selected_format = selected[video_id]
+        window.download_video()
+    loop.exec_()
+    wall = time.time() - submitted
+    cpu = cpu_seconds() - cpu_before
+
+    for signal, slot in connections:
+        signal.disconnect(slot)
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {jobs} benchmark downloads failed")
+
+    # Server side timestamps of the media bodies, grouped per video
+    requests = {}
+    with open(log_path) as f:
+        f.seek(log_offset)
+        for line in f:
+            entry = json.loads(line)
+            video_id = next((v for v in video_ids if f"/{v}-" in entry['path']), None)
+            if video_id is not None and entry['first_byte'] is not None:
+                requests.setdefault(video_id, []).append(entry)
+
+    ttfb, overhead = [], []
+    total_bytes = 0
+    for video_id in video_ids:
+        entries = requests[video_id]
+        first_byte = min(entry['first_byte'] for entry in entries)
+        last_byte = max(entry['finished'] for entry in entries)
+        total_bytes += sum(entry['bytes'] for entry in entries)
+        ttfb.append(first_byte - started[video_id])
+        overhead.append((finished[video_id] - started[video_id]) - (last_byte - first_byte))
+
+    return {
+        'kind': kind,
+        'size_bytes': size,
+        'jobs': jobs,
+        'workers': queue.max_workers,
+        'wall_seconds': wall,
+        'throughput_mib_s': total_bytes / MIB / wall,
+        'extract_seconds': extract_seconds,
+        'ttfb_median_seconds': statistics.median(ttfb),
+        'ttfb_p95_seconds': percentile(ttfb, 0.95),
+        'overhead_median_seconds': statistics.median(overhead),
+        'cpu_seconds_per_mib': cpu / (total_bytes / MIB),
+    }
+
+
+def bench_enhance(repeat=ENHANCE_REPEAT):
+    """
+    Time enhance_formats_with_audio on the stub's format list, as the format dialog calls it.
+
+    :return: Result dict
+    """
+    from downloader_core import enhance_formats_with_audio, unique_formats
+    from yt_dlp_plugins.extractor.bench_stub import realistic_formats
+
+    formats = unique_formats(realistic_formats('http://127.0.0.1:1', 'enhance'))
+    best = float('inf')
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            enhance_formats_with_audio(formats)
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return {'formats': len(formats), 'seconds_per_call': best}
+
+
+def run(kinds=DEFAULT_KINDS, sizes_mib=DEFAULT_SIZES_MIB, jobs=DEFAULT_JOBS, workers=DEFAULT_WORKERS,
+        latency_ms=0.0, out=sys.stdout):
+    """
+    Run every (kind, size) scenario and the enhance_formats_with_audio timing, printing a table.
+
+    :return: {'downloads': [scenario result dicts], 'enhance': result dict}
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    work_dir = tempfile.mkdtemp(prefix='avud-bench-')
+    # Caches, journal and archive of the benchmark stay out of the user's app data
+    os.environ['APPDATA'] = os.environ['XDG_DATA_HOME'] = os.path.join(work_dir, 'data')
+    log_path = os.path.join(work_dir, 'requests.jsonl')
+    open(log_path, 'w').close()
+    server, base_url = start_media_server(log_path, latency_ms)
+
+    from PyQt5.QtWidgets import QApplication
+    # Must outlive the window
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    import main
+
+    results = {'downloads': [], 'enhance': None}
+    try:
+        # Never shown, so the update check and other deferred services stay off
+        window = main.StyledVideoDownloader()
+        window.workers_spinbox.setValue(workers)
+        run_id = str(int(time.time()))
+
+        for kind in kinds:
+            for size_mib in sizes_mib:
+                window.output_dir = os.path.join(work_dir, 'out')
+                results['downloads'].append(
+                    run_scenario(window, base_url, log_path, kind, int(size_mib * MIB), jobs, run_id)
+                )
+                shutil.rmtree(window.output_dir, ignore_errors=True)
+        results['enhance'] = bench_enhance()
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Printed at the end, yt-dlp writes its progress lines to the console while downloading
+    out.write(f"\n{'kind':<12}{'MiB':>6}{'jobs':>6}{'MiB/s':>9}{'extract ms':>12}{'TTFB ms':>9}"
+              f"{'p95 ms':>8}{'overhead ms':>13}{'CPU s/MiB':>11}\n")
+    for result in results['downloads']:
+        out.write(
+            f"{result['kind']:<12}{result['size_bytes'] / MIB:>6g}{result['jobs']:>6}"
+            f"{result['throughput_mib_s']:>9.1f}{result['extract_seconds'] * 1000:>12.1f}"
+            f"{result['ttfb_median_seconds'] * 1000:>9.1f}{result['ttfb_p95_seconds'] * 1000:>8.1f}"
+            f"{result['overhead_median_seconds'] * 1000:>13.1f}{result['cpu_seconds_per_mib']:>11.4f}\n"
+        )
+    out.write(f"\nenhance_formats_with_audio: {results['enhance']['formats']} formats, "
+              f"{results['enhance']['seconds_per_call'] * 1e6:.1f} us per call\n")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the download path against a local media server.")
+    parser.add_argument('--kinds', nargs='+', choices=DEFAULT_KINDS, default=list(DEFAULT_KINDS))
+    parser.add_argument('--sizes-mib', type=float, nargs='+', default=list(DEFAULT_SIZES_MIB))
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help="Downloads per scenario")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Concurrent downloads")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Server delay before every response")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args(argv)
+    results = run(args.kinds, args.sizes_mib, args.jobs, args.workers, args.latency_ms)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
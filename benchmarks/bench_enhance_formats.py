@@ -0,0 +1,138 @@
+# bench_enhance_formats.py
+# Micro-benchmark for downloader_core.enhance_formats_with_audio on synthetic
+# format lists, compared with the previous multi-pass implementation.
+#
+#   python benchmarks/bench_enhance_formats.py [--sizes 1000 2000 5000 10000] [--skip-legacy]
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from downloader_core import enhance_formats_with_audio  # noqa: E402
+
+
+DEFAULT_SIZES = (1000, 2000, 5000, 10000)
+
+
+def synthetic_formats(count, seed=0):
+    """
+    Build a realistic mix of renditions: 40% video-only, 30% audio-only,
+    20% muxed and 10% unknown streams across mp4/webm/m4a containers.
+    """
+    rng = random.Random(seed)
+    formats = []
+    for i in range(count):
+        kind = rng.random()
+        fmt = {'format_id': f"f{i}", 'tbr': rng.uniform(50, 20000)}
+        if kind < 0.4:
+            fmt.update(ext=rng.choice(('mp4', 'webm')), vcodec=rng.choice(('avc1.64001f', 'vp9', 'av01')),
+                       acodec='none', height=rng.choice((144, 360, 720, 1080, 2160)), fps=rng.choice((25, 30, 60)))
+        elif kind < 0.7:
+            fmt.update(ext=rng.choice(('m4a', 'webm', 'mp4')), vcodec='none',
+                       acodec=rng.choice(('mp4a.40.2', 'opus')), abr=rng.uniform(32, 320))
+        elif kind < 0.9:
+            fmt.update(ext='mp4', vcodec='avc1.42001e', acodec='mp4a.40.2', height=rng.choice((360, 720)), fps=30)
+        else:
+            fmt.update(ext='mhtml', vcodec='none', acodec='none')
+        formats.append(fmt)
+    return formats
+
+
+def legacy_enhance_formats_with_audio(formats):
+    """
+    The previous implementation: four passes and a private compatible_audio
+    list per video-only format (O(video x audio) memory).
+    """
+    video_formats = [fmt for fmt in formats if fmt.get('vcodec', 'none') != 'none']
+    audio_formats = [fmt for fmt in formats
+                     if fmt.get('acodec', 'none') != 'none' and fmt.get('vcodec', 'none') == 'none']
+    mixed_formats = [fmt for fmt in formats
+                     if fmt.get('vcodec', 'none') != 'none' and fmt.get('acodec', 'none') != 'none']
+    unknown_formats = [fmt for fmt in formats
+                       if (fmt.get('vcodec', 'none') == 'none' and fmt.get('acodec', 'none') == 'none'
+                           and fmt.get('format_id', 'unknown') != 'unknown')]
+    enhanced_formats = []
+    for fmt in mixed_formats:
+        enhanced_fmt = fmt.copy()
+        enhanced_fmt.update(media_type='Video + Audio', audio_status='Built-in Audio', audio_extraction=True)
+        enhanced_formats.append(enhanced_fmt)
+    for fmt in video_formats:
+        if fmt.get('acodec', 'none') == 'none':
+            compatible_audio = [a for a in audio_formats if a.get('ext') == fmt.get('ext')] or audio_formats
+            enhanced_fmt = fmt.copy()
+            if compatible_audio:
+                enhanced_fmt.update(media_type='Video (Add Audio)',
+                                    audio_status=f'Merge with {len(compatible_audio)} audio streams',
+                                    potential_audio=compatible_audio, audio_merging=True)
+            else:
+                enhanced_fmt.update(media_type='Video (No Audio)', audio_status='No Audio Streams',
+                                    audio_merging=False)
+            enhanced_formats.append(enhanced_fmt)
+    for fmt in audio_formats:
+        enhanced_fmt = fmt.copy()
+        enhanced_fmt.update(media_type='Audio Only', audio_status='MP3/Audio Extraction', is_audio_only=True)
+        enhanced_formats.append(enhanced_fmt)
+    for fmt in unknown_formats:
+        enhanced_fmt = fmt.copy()
+        enhanced_fmt.update(media_type='Unknown Format', audio_status='Unidentified Stream',
+                            format_details={'ext': fmt.get('ext', 'Unknown'), 'height': fmt.get('height', 'N/A'),
+                                            'fps': fmt.get('fps', 'N/A')})
+        enhanced_formats.append(enhanced_fmt)
+    return enhanced_formats
+
+
+def measure(function, formats, repeat=3):
+    """
+    Return (best wall time in seconds, peak traced memory in bytes) of function(formats).
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(formats)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = function(formats)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def run(sizes=DEFAULT_SIZES, include_legacy=True, out=sys.stdout):
+    """
+    Run the benchmark and print one row per size.
+
+    :return: List of result dicts, one per (implementation, size)
+    """
+    results = []
+    implementations = [('single-pass', enhance_formats_with_audio)]
+    if include_legacy:
+        implementations.append(('legacy', legacy_enhance_formats_with_audio))
+
+    out.write(f"{'implementation':<14}{'formats':>9}{'time ms':>11}{'us/format':>11}{'peak MiB':>10}\n")
+    for size in sizes:
+        formats = synthetic_formats(size)
+        for name, function in implementations:
+            seconds, peak = measure(function, formats)
+            results.append({'implementation': name, 'formats': size, 'seconds': seconds, 'peak_bytes': peak})
+            out.write(f"{name:<14}{size:>9}{seconds * 1000:>11.2f}{seconds * 1e6 / size:>11.2f}"
+                      f"{peak / (1024 * 1024):>10.2f}\n")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark enhance_formats_with_audio on synthetic format lists.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time the current implementation")
+    args = parser.parse_args(argv)
+    run(args.sizes, include_legacy=not args.skip_legacy)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# media_server.py
+# Local HTTP server for the benchmarks: synthetic progressive files and HLS
+# playlists generated on the fly, with Range support and optional latency.
+#
+#   python benchmarks/media_server.py [--port 0] [--latency-ms 0] [--log requests.jsonl]
+#
+# Paths:
+#   /media/<bytes>/<name>.<ext>                     progressive file of exactly <bytes> bytes
+#   /hls/<segments>/<segment bytes>/<name>/index.m3u8   media playlist
+#   /hls/<segments>/<segment bytes>/<name>/<n>.ts       segment n
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Served bodies repeat this incompressible block
+BLOCK = random.Random(0).randbytes(64 * 1024)
+SEGMENT_SECONDS = 4
+CHUNK_SIZE = 64 * 1024
+
+_MEDIA_PATH = re.compile(r'^/media/(?P<size>\d+)/(?P<name>[\w.-]+)$')
+_PLAYLIST_PATH = re.compile(r'^/hls/(?P<segments>\d+)/(?P<segment_size>\d+)/(?P<name>[\w.-]+)/index\.m3u8$')
+_SEGMENT_PATH = re.compile(r'^/hls/(?P<segments>\d+)/(?P<segment_size>\d+)/(?P<name>[\w.-]+)/(?P<index>\d+)\.ts$')
+
+_CONTENT_TYPES = {'mp4': 'video/mp4', 'm4a': 'audio/mp4', 'webm': 'video/webm', 'ts': 'video/mp2t'}
+
+
+def media_url(base_url, size, name):
+    """
+    URL of a progressive file of size bytes
+    """
+    return f"{base_url}/media/{int(size)}/{name}"
+
+
+def hls_url(base_url, size, name, segment_size=512 * 1024):
+    """
+    URL of an HLS media playlist whose segments add up to at least size bytes
+    """
+    segments = max(1, -(-int(size) // segment_size))
+    return f"{base_url}/hls/{segments}/{segment_size}/{name}/index.m3u8"
+
+
+def _body(start, end):
+    # Bytes [start, end) of the endless repetition of BLOCK
+    offset = start
+    while offset < end:
+        block_offset = offset % len(BLOCK)
+        chunk = BLOCK[block_offset:block_offset + min(end - offset, CHUNK_SIZE)]
+        yield chunk
+        offset += len(chunk)
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'BenchMediaServer/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        received = time.time()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        match = _MEDIA_PATH.match(self.path)
+        if match:
+            return self._serve_bytes(int(match['size']), match['name'], send_body, received)
+        match = _SEGMENT_PATH.match(self.path)
+        if match and int(match['index']) < int(match['segments']):
+            return self._serve_bytes(int(match['segment_size']), f"{match['name']}.ts", send_body, received)
+        match = _PLAYLIST_PATH.match(self.path)
+        if match:
+            return self._serve_playlist(int(match['segments']), send_body)
+        self.send_error(404)
+
+    def _serve_playlist(self, segments, send_body):
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}', '#EXT-X-MEDIA-SEQUENCE:0']
+        for index in range(segments):
+            lines += [f'#EXTINF:{SEGMENT_SECONDS}.0,', f'{index}.ts']
+        lines.append('#EXT-X-ENDLIST')
+        body = ('\n'.join(lines) + '\n').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _serve_bytes(self, size, name, send_body, received):
+        start, end = 0, size
+        range_header = self.headers.get('Range')
+        match = re.match(r'^bytes=(\d*)-(\d*)$', range_header or '')
+        if match and (match[1] or match[2]):
+            if match[1]:
+                start = int(match[1])
+                end = min(size, int(match[2]) + 1) if match[2] else size
+            else:
+                start = max(0, size - int(match[2]))
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end - 1}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', _CONTENT_TYPES.get(name.rsplit('.', 1)[-1], 'application/octet-stream'))
+        self.send_header('Content-Length', str(end - start))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if not send_body:
+            return
+
+        first_byte = None
+        sent = 0
+        try:
+            for chunk in _body(start, end):
+                self.wfile.write(chunk)
+                if first_byte is None:
+                    first_byte = time.time()
+                sent += len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.server.log_request_times(self.path, received, first_byte, time.time(), sent)
+
+
+class MediaServer(ThreadingHTTPServer):
+    """
+    Threaded server for the synthetic media, see the module comment for its paths
+    """
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, log_path=None):
+        """
+        :param port: Port on 127.0.0.1, 0 picks a free one
+        :param latency: Seconds to wait before answering each request
+        :param log_path: JSON lines file receiving one entry per served media body
+        """
+        super().__init__(('127.0.0.1', port), MediaRequestHandler)
+        self.latency = latency
+        self._log_file = open(log_path, 'a', buffering=1) if log_path else None
+        self._log_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def log_request_times(self, path, received, first_byte, finished, sent):
+        if self._log_file is None:
+            return
+        entry = {'path': path, 'received': received, 'first_byte': first_byte, 'finished': finished, 'bytes': sent}
+        with self._log_lock:
+            self._log_file.write(json.dumps(entry) + '\n')
+
+    def server_close(self):
+        super().server_close()
+        if self._log_file is not None:
+            self._log_file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic progressive and HLS media for the benchmarks.")
+    parser.add_argument('--port', type=int, default=0, help="0 picks a free port")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Delay before every response")
+    parser.add_argument('--log', help="Append a JSON line per served media body to this file")
+    args = parser.parse_args(argv)
+
+    server = MediaServer(args.port, args.latency_ms / 1000, args.log)
+    # The benchmark runner reads the address from the first line
+    print(server.base_url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
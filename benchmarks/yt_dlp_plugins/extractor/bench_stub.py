@@ -0,0 +1,108 @@
+# bench_stub.py
+# yt-dlp extractor plugin for the benchmarks. It answers pages of the local
+# media server without any network access, with a format list shaped like a
+# YouTube video, and is loaded when the benchmarks folder is on sys.path.
+#
+#   http://127.0.0.1:<port>/watch/<progressive|hls>/<bytes>/<video id>
+from yt_dlp.extractor.common import InfoExtractor
+
+from media_server import media_url, hls_url
+
+
+DURATION = 600  # seconds
+# The format a benchmark job downloads for each page kind; its size is the <bytes> of the URL
+BENCH_FORMATS = {'progressive': '18', 'hls': 'hls-720p'}
+
+# format_id, ext, vcodec, acodec, height, fps, tbr (kbit/s)
+_AUDIO = [
+    ('139', 'm4a', 'none', 'mp4a.40.5', None, None, 49),
+    ('140', 'm4a', 'none', 'mp4a.40.2', None, None, 130),
+    ('249', 'webm', 'none', 'opus', None, None, 54),
+    ('250', 'webm', 'none', 'opus', None, None, 71),
+    ('251', 'webm', 'none', 'opus', None, None, 135),
+]
+_VIDEO = [
+    ('160', 'mp4', 'avc1.4d400c', 'none', 144, 30, 110),
+    ('133', 'mp4', 'avc1.4d4015', 'none', 240, 30, 250),
+    ('134', 'mp4', 'avc1.4d401e', 'none', 360, 30, 640),
+    ('135', 'mp4', 'avc1.4d401f', 'none', 480, 30, 1150),
+    ('136', 'mp4', 'avc1.64001f', 'none', 720, 30, 2300),
+    ('298', 'mp4', 'avc1.640020', 'none', 720, 60, 3400),
+    ('137', 'mp4', 'avc1.640028', 'none', 1080, 30, 4300),
+    ('299', 'mp4', 'avc1.64002a', 'none', 1080, 60, 6000),
+    ('278', 'webm', 'vp9', 'none', 144, 30, 95),
+    ('242', 'webm', 'vp9', 'none', 240, 30, 220),
+    ('243', 'webm', 'vp9', 'none', 360, 30, 400),
+    ('244', 'webm', 'vp9', 'none', 480, 30, 750),
+    ('247', 'webm', 'vp9', 'none', 720, 30, 1500),
+    ('302', 'webm', 'vp9', 'none', 720, 60, 2600),
+    ('248', 'webm', 'vp9', 'none', 1080, 30, 2700),
+    ('303', 'webm', 'vp9', 'none', 1080, 60, 4400),
+    ('271', 'webm', 'vp9', 'none', 1440, 30, 9000),
+    ('313', 'webm', 'vp9', 'none', 2160, 30, 18000),
+    ('394', 'mp4', 'av01.0.00M.08', 'none', 144, 30, 80),
+    ('395', 'mp4', 'av01.0.00M.08', 'none', 240, 30, 180),
+    ('396', 'mp4', 'av01.0.01M.08', 'none', 360, 30, 350),
+    ('397', 'mp4', 'av01.0.04M.08', 'none', 480, 30, 650),
+    ('398', 'mp4', 'av01.0.05M.08', 'none', 720, 30, 1300),
+    ('399', 'mp4', 'av01.0.08M.08', 'none', 1080, 30, 2400),
+]
+_MUXED = [
+    ('18', 'mp4', 'avc1.42001E', 'mp4a.40.2', 360, 30, 700),
+]
+_HLS = [
+    ('hls-360p', 'mp4', 'avc1.4D401E', 'mp4a.40.2', 360, 30, 900),
+    ('hls-480p', 'mp4', 'avc1.4D401F', 'mp4a.40.2', 480, 30, 1400),
+    ('hls-720p', 'mp4', 'avc1.4D401F', 'mp4a.40.2', 720, 30, 2700),
+    ('hls-1080p', 'mp4', 'avc1.640028', 'mp4a.40.2', 1080, 30, 5000),
+]
+
+
+def realistic_formats(base_url, video_id, bench_kind='progressive', bench_size=1024 * 1024):
+    """
+    Format list as an extractor returns it. The benchmark format of bench_kind
+    serves bench_size bytes, every other one the size its bitrate implies.
+    """
+    formats = []
+    for rows, protocol in ((_AUDIO, 'http'), (_VIDEO, 'http'), (_MUXED, 'http'), (_HLS, 'm3u8_native')):
+        for format_id, ext, vcodec, acodec, height, fps, tbr in rows:
+            is_bench = BENCH_FORMATS[bench_kind] == format_id
+            size = bench_size if is_bench else tbr * 1000 // 8 * DURATION
+            name = f"{video_id}-{format_id}.{ext}"
+            fmt = {
+                'format_id': format_id,
+                'ext': ext,
+                'vcodec': vcodec,
+                'acodec': acodec,
+                'tbr': tbr,
+                'protocol': protocol,
+            }
+            if protocol == 'm3u8_native':
+                fmt.update(url=hls_url(base_url, size, name.rsplit('.', 1)[0]), filesize_approx=size)
+            else:
+                fmt.update(url=media_url(base_url, size, name), filesize=size)
+            if vcodec != 'none':
+                fmt.update(height=height, width=height * 16 // 9, fps=fps)
+            if acodec != 'none':
+                fmt.update(abr=tbr if vcodec == 'none' else 128, asr=48000 if acodec == 'opus' else 44100)
+            formats.append(fmt)
+    # Storyboards, listed as a format without any codec
+    formats.append({
+        'format_id': 'sb0', 'ext': 'mhtml', 'vcodec': 'none', 'acodec': 'none', 'protocol': 'mhtml',
+        'url': media_url(base_url, 4096, f"{video_id}-sb0.jpg"),
+    })
+    return formats
+
+
+class BenchStubIE(InfoExtractor):
+    IE_NAME = 'benchstub'
+    _VALID_URL = r'(?P<base>https?://127\.0\.0\.1:\d+)/watch/(?P<kind>progressive|hls)/(?P<size>\d+)/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        base_url, kind, size, video_id = self._match_valid_url(url).group('base', 'kind', 'size', 'id')
+        return {
+            'id': video_id,
+            'title': f"Benchmark {kind} {video_id}",
+            'duration': DURATION,
+            'formats': realistic_formats(base_url, video_id, kind, int(size)),
+        }
@@ -0,0 +1,263 @@
+# bandwidth_manager.py
+# Shared download rate limits: a global limit, optional per-host caps and a
+# max-min fair split between the running jobs. Qt-free.
+import re
+import threading
+import time
+
+
+# Seconds of traffic a job may burst after being idle
+BURST_SECONDS = 0.5
+MIN_BURST_BYTES = 64 * 1024
+# yt-dlp read size while a limit is active, so sleeps stay short and smooth
+LIMITED_BUFFER_SIZE = 16 * 1024
+# Weight of the newest rate sample in a job's measured speed
+SPEED_WEIGHT = 0.3
+
+_RATE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'kib': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2,
+               'mib': 1024 ** 2, 'g': 1024 ** 3, 'gb': 1024 ** 3, 'gib': 1024 ** 3}
+
+
+def parse_rate(text):
+    """
+    Parse a rate like 500K, 2M or 1.5MiB (per second) into bytes/s.
+    0, 'none' and 'unlimited' mean no limit and return None.
+
+    :raises ValueError: For text that is not a rate
+    """
+    text = str(text).strip().lower()
+    if text in ('', '0', 'none', 'unlimited'):
+        return None
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([kmg]?i?b?)(?:/s)?', text)
+    if not match or match.group(2) not in _RATE_UNITS:
+        raise ValueError(f"Invalid rate: {text!r}")
+    return float(match.group(1)) * _RATE_UNITS[match.group(2)] or None
+
+
+def format_rate(rate):
+    """
+    Write bytes/s the way parse_rate reads them, e.g. 512K or 1.5M
+    """
+    for unit, size in (('G', 1024 ** 3), ('M', 1024 ** 2), ('K', 1024)):
+        if rate >= size:
+            return f"{rate / size:g}{unit}"
+    return f"{rate:g}"
+
+
+def parse_host_limits(values):
+    """
+    Turn HOST=RATE strings into a dict of host -> bytes/s.
+
+    :raises ValueError: For a malformed value
+    """
+    host_limits = {}
+    for value in values:
+        host, sep, rate = value.partition('=')
+        if not sep or not host.strip():
+            raise ValueError(f"Invalid host limit: {value!r}, expected HOST=RATE")
+        host_limits[host.strip().lower()] = parse_rate(rate)
+    return host_limits
+
+
+def fair_shares(demands, capacity):
+    """
+    Max-min fair split of capacity: jobs asking for less than an equal share
+    get what they ask for, the rest is split equally among the others.
+
+    :param demands: Dict of key -> upper bound in bytes/s (None for unbounded)
+    :param capacity: Total bytes/s to hand out
+    :return: Dict of key -> bytes/s
+    """
+    shares = {}
+    remaining = capacity
+    unsettled = dict(demands)
+    while unsettled:
+        share = remaining / len(unsettled)
+        satisfied = {key: demand for key, demand in unsettled.items() if demand is not None and demand <= share}
+        if not satisfied:
+            for key in unsettled:
+                shares[key] = share
+            break
+        for key, demand in satisfied.items():
+            shares[key] = demand
+            remaining -= demand
+            del unsettled[key]
+    return shares
+
+
+class JobThrottle:
+    """
+    Token bucket for one running download. Feed it every yt-dlp progress
+    dict; it sleeps on the calling thread when the job is over its rate.
+    """
+    def __init__(self, manager, key, host):
+        self.manager = manager
+        self.key = key
+        self.host = host
+        self.rate = None  # bytes/s, None when unlimited
+        self.speed = None  # Measured bytes/s, lets slow jobs give up bandwidth they don't use
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._last_file = None
+        self._last_bytes = 0
+        self._window_start = self._last_refill
+        self._window_bytes = 0
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            self.rate = rate
+            self._tokens = min(self._tokens, self._capacity())
+
+    def _capacity(self):
+        return max(MIN_BURST_BYTES, (self.rate or 0) * BURST_SECONDS)
+
+    def consume(self, d):
+        """
+        Account for the bytes downloaded since the last progress dict.
+        """
+        if d.get('status') != 'downloading':
+            return
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._lock:
+            if d.get('filename') != self._last_file or downloaded < self._last_bytes:
+                # yt-dlp starts counting again for every file
+                self._last_file = d.get('filename')
+                self._last_bytes = 0
+            num_bytes = downloaded - self._last_bytes
+            self._last_bytes = downloaded
+
+            now = time.monotonic()
+            self._window_bytes += num_bytes
+            if now - self._window_start >= 1.0:
+                rate = self._window_bytes / (now - self._window_start)
+                self.speed = rate if self.speed is None else self.speed + SPEED_WEIGHT * (rate - self.speed)
+                self._window_start = now
+                self._window_bytes = 0
+
+            if self.rate is None:
+                self._tokens = 0.0
+                self._last_refill = now
+                return
+            self._tokens = min(self._capacity(), self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= num_bytes
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+class BandwidthManager:
+    """
+    Hands every running download a JobThrottle and keeps their rates at a
+    max-min fair split of the global limit and of each host's cap.
+    Limits can be changed at any time, running jobs follow within a second.
+    """
+    def __init__(self, global_limit=None, host_limits=None):
+        """
+        :param global_limit: bytes/s for all downloads together, None for unlimited
+        :param host_limits: Dict of domain -> bytes/s for all downloads from that domain
+                            and its subdomains, e.g. youtube.com covers www.youtube.com
+        """
+        self.global_limit = global_limit
+        self.host_limits = dict(host_limits or {})
+        self._throttles = {}
+        self._lock = threading.Lock()
+        self._last_rebalance = 0.0
+
+    def is_limited(self):
+        return bool(self.global_limit or self.host_limits)
+
+    def set_global_limit(self, rate):
+        with self._lock:
+            self.global_limit = rate
+            self._rebalance()
+
+    def set_host_limit(self, host, rate):
+        with self._lock:
+            if rate:
+                self.host_limits[host.lower()] = rate
+            else:
+                self.host_limits.pop(host.lower(), None)
+            self._rebalance()
+
+    def host_limit_domain(self, host):
+        """
+        Return the most specific domain with a limit that host belongs to, or None
+        """
+        matches = [domain for domain in self.host_limits if host == domain or host.endswith('.' + domain)]
+        return max(matches, key=len, default=None)
+
+    def register(self, key, host=None):
+        """
+        Start limiting a download.
+
+        :param key: Unique key of the download, e.g. the job id
+        :param host: Host name of the video's page
+        """
+        with self._lock:
+            throttle = JobThrottle(self, key, (host or '').lower())
+            self._throttles[key] = throttle
+            self._rebalance()
+            return throttle
+
+    def unregister(self, key):
+        with self._lock:
+            self._throttles.pop(key, None)
+            self._rebalance()
+
+    def progress_hook(self, throttle):
+        """
+        Return a yt-dlp progress hook that limits the download to throttle's rate.
+        """
+        def hook(d):
+            throttle.consume(d)
+            # Measured speeds change the fair split, refresh it now and then
+            if self.is_limited() and time.monotonic() - self._last_rebalance >= 1.0:
+                with self._lock:
+                    self._rebalance()
+        return hook
+
+    def _rebalance(self):
+        self._last_rebalance = time.monotonic()
+        if not self.is_limited():
+            for throttle in self._throttles.values():
+                throttle.set_rate(None)
+            return
+        demands = {}
+        by_domain = {}
+        for key, throttle in self._throttles.items():
+            by_domain.setdefault(self.host_limit_domain(throttle.host), []).append(key)
+
+        for domain, keys in by_domain.items():
+            host_limit = self.host_limits.get(domain)
+            # A job that stays well below its share probably can't go faster;
+            # only what it really uses is reserved for it
+            host_demands = {key: self._demand(self._throttles[key]) for key in keys}
+            if host_limit:
+                demands.update(fair_shares(host_demands, host_limit))
+            else:
+                demands.update(host_demands)
+
+        if self.global_limit:
+            rates = fair_shares(demands, self.global_limit)
+        else:
+            rates = demands
+        for key, throttle in self._throttles.items():
+            rate = rates.get(key)
+            if rate is not None and self._demand(throttle) is not None and rate == self._demand(throttle):
+                # Leave room to speed up again, the next rebalance gives back what is unused
+                rate *= 1.25
+            throttle.set_rate(rate)
+
+    @staticmethod
+    def _demand(throttle):
+        if throttle.speed is None or throttle.rate is None:
+            return None
+        if throttle.speed < throttle.rate * 0.8:
+            return throttle.speed
+        return None
+
+
+# Shared by every download of this process
+bandwidth_manager = BandwidthManager()
@@ -0,0 +1,274 @@
+# cli.py
+# Headless entry point, run from the src folder with: python -m cli URL [URL ...]
+# Only uses the Qt-free core, so PyQt5 is never imported.
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from downloader_core import DownloadJob, DownloadFailed, run_download, resume_unfinished_jobs, DEFAULT_FORMAT_SPEC
+from job_journal import get_job_journal
+from format_ranking import parse_policy
+from bandwidth_manager import bandwidth_manager, parse_rate, parse_host_limits
+from progress_aggregator import format_bytes
+from remux import CONTAINER_CODECS, DEFAULT_CONTAINER
+from job_metrics import job_metrics
+from utils import strip_ansi_codes
+
+
+DEFAULT_JOBS = 3
+# Seconds between checks of the --control-file
+CONTROL_POLL_INTERVAL = 1.0
+
+
+class JsonLinesReporter:
+    """
+    Print one JSON object per line for every job event, safe to call from worker threads
+    """
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, job, **fields):
+        record = {'event': event, 'job': job.job_id, 'url': job.url, 'time': round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Download videos without a display, printing progress as JSON lines."
+    )
+    parser.add_argument('urls', nargs='*', help="Video URLs to download")
+    parser.add_argument('-a', '--batch-file', help="File with one URL per line, '-' for stdin")
+    parser.add_argument('-o', '--output-dir', default='.', help="Directory to save downloads in")
+    parser.add_argument('-f', '--format', default=DEFAULT_FORMAT_SPEC,
+                        help=f"yt-dlp format selector (default: {DEFAULT_FORMAT_SPEC})")
+    parser.add_argument('-p', '--policy',
+                        help="Pick the format automatically instead of --format: best, best-<H>p, "
+                             "smallest-with-audio, audio-only, fit:<N>MB or time:<T>min")
+    parser.add_argument('--container', choices=sorted(CONTAINER_CODECS), default=DEFAULT_CONTAINER,
+                        help=f"Preferred container for merged video and audio (default: {DEFAULT_CONTAINER}); "
+                             "streams are copied, another container is used when the codecs don't fit")
+    parser.add_argument('--force-container', action='store_true',
+                        help="Always produce --container, re-encoding when the codecs don't fit")
+    parser.add_argument('-r', '--limit-rate', help="Speed limit for all downloads together, e.g. 500K or 2M")
+    parser.add_argument('--host-limit', action='append', default=[], metavar='HOST=RATE',
+                        help="Speed limit for all downloads from one site, e.g. youtube.com=500K; "
+                             "covers its subdomains, can be repeated")
+    parser.add_argument('--control-file',
+                        help="JSON file re-read while running to change limits, e.g. "
+                             "{\"limit_rate\": \"1M\", \"host_limits\": {\"example.com\": \"200K\"}}")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="Download again even when the archive says a video was already downloaded")
+    parser.add_argument('--resume', action='store_true',
+                        help="Also continue downloads an earlier run left unfinished")
+    parser.add_argument('--metrics-log', help="Append per-job phase timings as JSON lines to this file "
+                                               "(default: job_metrics.jsonl in the app data folder)")
+    parser.add_argument('--metrics-file', help="Keep per-site totals in this Prometheus text file "
+                                                "(default: job_metrics.prom in the app data folder)")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Also serve the per-site totals at http://127.0.0.1:PORT/metrics while running")
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS,
+                        help=f"Number of parallel downloads (default: {DEFAULT_JOBS})")
+    return parser.parse_args(argv)
+
+
+def read_urls(args):
+    urls = list(args.urls)
+    if args.batch_file:
+        stream = sys.stdin if args.batch_file == '-' else open(args.batch_file, encoding='utf-8')
+        with stream:
+            urls.extend(line.strip() for line in stream)
+    # Skip blank lines and comments
+    return [url for url in urls if url and not url.startswith('#')]
+
+
+def apply_limits(limit_rate, host_limits):
+    bandwidth_manager.set_global_limit(limit_rate)
+    for host in set(bandwidth_manager.host_limits) - set(host_limits):
+        bandwidth_manager.set_host_limit(host, None)
+    for host, rate in host_limits.items():
+        bandwidth_manager.set_host_limit(host, rate)
+
+
+def watch_control_file(path, base_rate, base_host_limits, stop_event):
+    """
+    Apply the limits in the JSON file at path whenever it changes, until stop_event is set.
+    Keys missing from the file fall back to the command line values.
+    """
+    last_mtime = None
+    while not stop_event.wait(CONTROL_POLL_INTERVAL):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        if mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        try:
+            with open(path, encoding='utf-8') as f:
+                control = json.load(f)
+            limit_rate = parse_rate(control['limit_rate']) if 'limit_rate' in control else base_rate
+            host_limits = dict(base_host_limits)
+            host_limits.update(parse_host_limits(f"{host}={rate}" for host, rate in control.get('host_limits', {}).items()))
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print(f"Ignoring control file: {e}", file=sys.stderr)
+            continue
+        apply_limits(limit_rate, host_limits)
+        hosts = ', '.join(f"{host} {format_bytes(rate)}/s" for host, rate in host_limits.items() if rate)
+        total = f"{format_bytes(limit_rate)}/s" if limit_rate else "unlimited"
+        print(f"Limits changed: {total}" + (f" ({hosts})" if hosts else ""), file=sys.stderr)
+
+
+def run_job(job, reporter, on_entry=None, on_postprocess=None):
+    """
+    Run one job on the calling thread and report its events.
+
+    :param on_entry: Called with a new DownloadJob for every video of a playlist
+    :param on_postprocess: Called with a Future of the job's merge when it was handed
+                           to the postprocess pool; the job's last event is reported then
+    :return: True when the download succeeded
+    """
+    reporter.emit('started', job)
+    try:
+        title = run_download(
+            job,
+            on_progress=lambda snapshot: reporter.emit('progress', job, **snapshot),
+            on_status=lambda text: reporter.emit('status', job, message=text),
+            quiet=True,
+            on_entry=on_entry,
+            defer_postprocessing=on_postprocess is not None
+        )
+    except DownloadFailed as e:
+        reporter.emit('failed', job, error=str(e))
+        return False
+    if job.postprocess_future is not None:
+        merged = Future()
+
+        def on_merged(future):
+            # Runs in the pool, where an exception would only be logged and merged never resolve
+            try:
+                merged.set_result(report_postprocessing(job, future, reporter))
+            except Exception:
+                merged.set_result(False)
+
+        job.postprocess_future.add_done_callback(on_merged)
+        on_postprocess(merged)
+        return True
+    if job.playlist_size is not None:
+        reporter.emit('expanded', job, title=title, entries=job.playlist_size)
+    elif job.skipped:
+        reporter.emit('skipped', job, title=title, reason='already downloaded')
+    else:
+        reporter.emit('finished', job, title=title)
+    return True
+
+
+def report_postprocessing(job, future, reporter):
+    """
+    Report how the merge of a job ended.
+
+    :return: True when it succeeded
+    """
+    try:
+        title = future.result()
+    except DownloadFailed as e:
+        reporter.emit('failed', job, error=str(e))
+        return False
+    except Exception as e:
+        reporter.emit('failed', job, error=f"An unexpected error occurred: {strip_ansi_codes(str(e))}")
+        return False
+    reporter.emit('finished', job, title=title)
+    return True
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        if args.policy:
+            parse_policy(args.policy)
+        limit_rate = parse_rate(args.limit_rate) if args.limit_rate else None
+        host_limits = parse_host_limits(args.host_limit)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    apply_limits(limit_rate, host_limits)
+    job_metrics.configure(args.metrics_log, args.metrics_file)
+    if args.metrics_port is not None:
+        job_metrics.serve(args.metrics_port)
+    urls = read_urls(args)
+    jobs = resume_unfinished_jobs('cli') if args.resume else []
+    if not urls and not jobs:
+        print("No URLs given." if not args.resume else "No URLs given and nothing to resume.", file=sys.stderr)
+        return 2
+
+    reporter = JsonLinesReporter()
+    for job in jobs:
+        reporter.emit('resumed', job, title=job.title)
+    jobs.extend(
+        DownloadJob(url, output_dir=args.output_dir, format_spec=args.format, format_policy=args.policy)
+        for url in urls
+    )
+    def configure(job):
+        job.use_archive = not args.no_archive
+        job.container = args.container
+        job.strict_container = args.force_container
+
+    journal = get_job_journal()
+    for job in jobs:
+        configure(job)
+        if job.journal_id is None:
+            journal.add(job, 'cli')
+            reporter.emit('queued', job)
+
+    stop_watching = threading.Event()
+    if args.control_file:
+        threading.Thread(
+            target=watch_control_file, args=(args.control_file, limit_rate, host_limits, stop_watching), daemon=True
+        ).start()
+
+    results = []
+    futures = set()
+    futures_lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        def submit(job):
+            # Playlist entries are submitted from worker threads while the playlist is listed
+            with futures_lock:
+                futures.add(pool.submit(run_job, job, reporter, submit_entry, track))
+
+        def track(future):
+            # Merges run in the postprocess pool while this pool moves on to the next download
+            with futures_lock:
+                futures.add(future)
+
+        def submit_entry(job):
+            configure(job)
+            reporter.emit('queued', job, title=job.title)
+            submit(job)
+
+        for job in jobs:
+            submit(job)
+        while True:
+            with futures_lock:
+                running = set(futures)
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            with futures_lock:
+                futures.difference_update(done)
+            results.extend(future.result() for future in done)
+    stop_watching.set()
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# disk_space.py
+# Admission control for downloads: refuse to start a job whose estimated size
+# does not fit next to the space already promised to other jobs. Qt-free.
+import os
+import shutil
+import sys
+import threading
+import time
+
+from format_ranking import estimate_size
+
+
+# Always leave this much free on the volume
+SAFETY_MARGIN = 64 * 1024 * 1024
+# Merging and converting keep the downloaded streams until the output is written
+MERGE_FACTOR = 2
+# Reservation files shrink in steps of this many bytes as the download writes
+PREALLOCATE_STEP = 8 * 1024 * 1024
+RESERVE_PREFIX = ".avud-reserve-"
+# Reservation files untouched for this long were left behind by a crash (seconds)
+STALE_RESERVE_AGE = 6 * 3600
+
+# Linux fallocate(2) mode: allocate blocks past the end of the file, its size stays 0
+FALLOC_FL_KEEP_SIZE = 0x01
+
+if sys.platform.startswith('linux'):
+    import ctypes
+    # Unlike os.posix_fallocate, glibc does not emulate this by writing zeros
+    # when the filesystem can't allocate natively, it fails with EOPNOTSUPP
+    _fallocate = getattr(ctypes.CDLL(None, use_errno=True), 'fallocate64', None)
+    if _fallocate is not None:
+        _fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+else:
+    _fallocate = None
+
+
+class DiskSpaceError(Exception):
+    """
+    Raised when a download does not fit on its volume, with a message for the user
+    """
+
+
+def estimate_job_bytes(selected_format, duration=None):
+    """
+    Estimate the disk space a download of selected_format needs at its peak,
+    or None when the size is unknown.
+    """
+    if not selected_format:
+        return None
+    size = estimate_size(selected_format, duration)
+    if not size:
+        return None
+    if selected_format.get('potential_audio'):
+        size *= MERGE_FACTOR
+    # Bitrate based estimates are fractional, preallocation needs whole bytes
+    return int(size)
+
+
+def _existing_dir(path):
+    # The output folder may not exist yet, its nearest existing parent is on the same volume
+    path = os.path.abspath(path or '.')
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _format_size(num_bytes):
+    return f"{num_bytes / (1024 * 1024):.0f} MB"
+
+
+class Reservation:
+    """
+    Space promised to one job, optionally backed by a preallocated file
+    """
+    def __init__(self, key, directory, device, size):
+        self.key = key
+        self.directory = directory
+        self.device = device
+        self.size = size or 0
+        self.written = 0
+        self.reserve_file = None
+        self.allocated = 0  # Bytes currently held by the reservation file
+
+    def remaining(self):
+        return max(0, self.size - self.written)
+
+
+class DiskSpaceManager:
+    """
+    Thread-safe bookkeeping of the space promised to queued and running jobs, per volume
+    """
+    def __init__(self, safety_margin=SAFETY_MARGIN):
+        self.safety_margin = safety_margin
+        self._reservations = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key, directory, size, preallocate=False):
+        """
+        Promise size bytes in directory to key, replacing its earlier reservation.
+
+        :param size: Estimated bytes, None when unknown (only the safety margin is checked)
+        :param preallocate: Back the reservation with a file that shrinks as the job writes,
+                            where the filesystem can preallocate natively
+        :raises DiskSpaceError: When the volume can't hold it next to the other reservations
+        """
+        directory = _existing_dir(directory)
+        with self._lock:
+            self._release(key)
+            device = os.stat(directory).st_dev
+            free = shutil.disk_usage(directory).free
+            # Preallocated bytes are already gone from free, don't count them twice
+            promised = sum(
+                r.remaining() - r.allocated for r in self._reservations.values() if r.device == device
+            )
+            needed = (size or 0) + self.safety_margin
+            if free - promised < needed:
+                raise DiskSpaceError(
+                    f"Not enough disk space: needs about {_format_size(size or 0)}, "
+                    f"{_format_size(max(0, free - promised - self.safety_margin))} available."
+                )
+            reservation = Reservation(key, directory, device, size)
+            self._reservations[key] = reservation
+        if preallocate and size:
+            self._preallocate(reservation)
+        return reservation
+
+    def _preallocate(self, reservation):
+        _remove_stale_reserve_files(reservation.directory)
+        if _fallocate is None and os.name != 'nt':
+            # No native preallocation, the reservation stays bookkeeping only
+            return
+        path = os.path.join(reservation.directory, f"{RESERVE_PREFIX}{os.getpid()}-{reservation.key}")
+        try:
+            with open(path, 'wb') as f:
+                _allocate(f.fileno(), reservation.size)
+        except OSError:
+            # Not supported by this filesystem, or the space went to someone else meanwhile
+            _remove(path)
+            return
+        with self._lock:
+            if self._reservations.get(reservation.key) is reservation:
+                reservation.reserve_file = path
+                reservation.allocated = reservation.size
+                return
+        _remove(path)
+
+    def update(self, key, written):
+        """
+        Record that key has written bytes so far; its reservation file shrinks to match.
+        """
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is None:
+                return
+            reservation.written = written
+            target = reservation.remaining()
+            if reservation.reserve_file is None or reservation.allocated - target < PREALLOCATE_STEP:
+                return
+            reservation.allocated = target
+            path = reservation.reserve_file
+        try:
+            _shrink(path, target)
+        except OSError:
+            pass
+
+    def release(self, key):
+        with self._lock:
+            self._release(key)
+
+    def _release(self, key):
+        reservation = self._reservations.pop(key, None)
+        if reservation is not None and reservation.reserve_file:
+            _remove(reservation.reserve_file)
+
+
+def _allocate(fd, size):
+    # Take size bytes for the open file, only where the filesystem does it natively
+    if _fallocate is None:
+        # Extending a file allocates it on NTFS
+        os.ftruncate(fd, size)
+        return
+    if _fallocate(fd, FALLOC_FL_KEEP_SIZE, 0, size) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+
+
+def _shrink(path, size):
+    # Give back what a reservation file holds beyond size
+    if _fallocate is None:
+        os.truncate(path, size)
+        return
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        # Blocks kept past the end are only freed by truncating, then the rest is taken again
+        os.ftruncate(fd, 0)
+        _allocate(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _remove_stale_reserve_files(directory):
+    now = time.time()
+    try:
+        names = [name for name in os.listdir(directory) if name.startswith(RESERVE_PREFIX)]
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) > STALE_RESERVE_AGE:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# Shared by the queue and the download core
+disk_space = DiskSpaceManager()
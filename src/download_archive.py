@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from utils import app_data_path, sqlite_connect
+from metadata_cache import normalize_url
+
+
+class DownloadArchive:
+    """
+    SQLite index of finished downloads keyed by (extractor, video id, format),
+    plus the URLs that led to them, so repeated URLs are recognised without
+    extracting them again.
+    """
+    def __init__(self, db_path=None):
+        """
+        :param db_path: SQLite database file, defaults to the app data folder
+        """
+        self.db_path = db_path or app_data_path("download_archive.sqlite3")
+        with sqlite_connect(self.db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS archive (
+                    extractor TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    format_key TEXT NOT NULL,
+                    filepath TEXT,
+                    title TEXT,
+                    downloaded_at REAL NOT NULL,
+                    PRIMARY KEY (extractor, video_id, format_key)
+                );
+                CREATE TABLE IF NOT EXISTS archive_urls (
+                    url TEXT PRIMARY KEY,
+                    extractor TEXT NOT NULL,
+                    video_id TEXT NOT NULL
+                );
+            """)
+
+    def find(self, extractor, video_id, format_key):
+        """
+        Return the archived title for the video in this format, or None.
+        Entries whose file was deleted since no longer count.
+        """
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                row = conn.execute(
+                    "SELECT filepath, title FROM archive WHERE extractor = ? AND video_id = ? AND format_key = ?",
+                    (extractor.lower(), video_id, format_key)
+                ).fetchone()
+                if row is None:
+                    return None
+                filepath, title = row
+                if filepath and not os.path.exists(filepath):
+                    conn.execute(
+                        "DELETE FROM archive WHERE extractor = ? AND video_id = ? AND format_key = ?",
+                        (extractor.lower(), video_id, format_key)
+                    )
+                    return None
+            return title or video_id
+        except sqlite3.Error as e:
+            print(f"Download archive read error: {e}", file=sys.stderr)
+            return None
+
+    def lookup_url(self, url):
+        """
+        Return (extractor, video_id) for a URL that was downloaded before, or None.
+        """
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                return conn.execute(
+                    "SELECT extractor, video_id FROM archive_urls WHERE url = ?", (normalize_url(url),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Download archive read error: {e}", file=sys.stderr)
+            return None
+
+    def remember_urls(self, extractor, video_id, urls):
+        """
+        Point more URLs at a video that is already archived.
+        """
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO archive_urls VALUES (?, ?, ?)",
+                    [(normalize_url(url), extractor.lower(), video_id) for url in set(urls) if url]
+                )
+        except sqlite3.Error as e:
+            print(f"Download archive write error: {e}", file=sys.stderr)
+
+    def record(self, extractor, video_id, format_key, filepath=None, title=None, urls=()):
+        """
+        Store a finished download and the URLs it is known by.
+        """
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?, ?, ?)",
+                    (extractor.lower(), video_id, format_key, filepath, title, time.time())
+                )
+        except sqlite3.Error as e:
+            print(f"Download archive write error: {e}", file=sys.stderr)
+            return
+        self.remember_urls(extractor, video_id, urls)
+
+
+_extractor_classes = None
+_extractor_classes_lock = threading.Lock()
+
+
+def extractor_for_url(url):
+    """
+    Return the specific yt-dlp extractor class that handles url, or None when
+    only the generic extractor would. Needs no network access.
+    """
+    global _extractor_classes
+    with _extractor_classes_lock:
+        if _extractor_classes is None:
+            from yt_dlp.extractor import gen_extractor_classes
+            try:
+                # Newer yt-dlp loads extractor plugins with the first YoutubeDL, which may not exist yet
+                from yt_dlp.plugins import all_plugins_loaded, load_all_plugins
+                if not all_plugins_loaded.value:
+                    load_all_plugins()
+            except ImportError:
+                pass
+            # The generic extractor matches everything and has no id until it downloads the page
+            _extractor_classes = [ie for ie in gen_extractor_classes() if ie.ie_key() != 'Generic']
+    return next((ie for ie in _extractor_classes if ie.suitable(url)), None)
+
+
+def video_key_from_url(url):
+    """
+    Return (extractor, video_id) when a specific yt-dlp extractor can read the
+    id from the URL itself, without any network access. None otherwise.
+    """
+    ie = extractor_for_url(url)
+    if ie is None:
+        return None
+    try:
+        video_id = ie.get_temp_id(url)
+    except Exception:
+        return None
+    return (ie.ie_key().lower(), video_id) if video_id else None
+
+
+_download_archive = None
+_download_archive_lock = threading.Lock()
+
+
+def get_download_archive():
+    """
+    Return the shared DownloadArchive, opening the database on first use.
+    """
+    global _download_archive
+    with _download_archive_lock:
+        if _download_archive is None:
+            _download_archive = DownloadArchive()
+        return _download_archive
@@ -0,0 +1,131 @@
+from collections import deque
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from download_worker import DownloadWorker
+from downloader_core import DownloadJob, DownloadFailed, admit_queued_job
+from job_journal import get_job_journal
+
+
+DEFAULT_MAX_WORKERS = 3
+
+
+class DownloadQueue(QObject):
+    """
+    Job queue that runs at most max_workers DownloadWorker threads at a time
+    """
+    job_added = pyqtSignal(object)
+    job_started = pyqtSignal(object)
+    job_progress = pyqtSignal(object, dict)
+    job_status = pyqtSignal(object, str)
+    job_finished = pyqtSignal(object)
+    job_failed = pyqtSignal(object, str)
+    queue_changed = pyqtSignal(int, int)  # active jobs, pending jobs
+    # Emitted from the postprocess pool, delivered on the GUI thread
+    _postprocess_done = pyqtSignal(object, object)  # job, concurrent.futures.Future
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self.max_workers = max(1, max_workers)
+        self.pending = deque()
+        self.workers = {}  # job_id -> (job, DownloadWorker)
+        self.expanding = {}  # job_id -> (job, DownloadWorker) listing a playlist, outside the worker limit
+        self.postprocessing = {}  # job_id -> job being merged in the postprocess pool, outside the worker limit
+        self._postprocess_done.connect(self._handle_postprocess_done)
+
+    def add_job(self, url, selected_format, output_dir, format_policy=None):
+        """
+        Queue a new download and start it as soon as a worker is free.
+        Without a selected format, format_policy picks one when the job starts.
+        A playlist URL queues one job per video while it is being listed.
+        """
+        job = DownloadJob(url, selected_format, output_dir, format_policy=format_policy)
+        self._enqueue(job)
+        return job
+
+    def resume_jobs(self, jobs):
+        """
+        Queue jobs restored from the journal, see downloader_core.resume_unfinished_jobs.
+        """
+        for job in jobs:
+            self._enqueue(job)
+
+    def _enqueue(self, job):
+        get_job_journal().add(job, 'gui')
+        self.job_added.emit(job)
+        try:
+            # Jobs with a known size hold their disk space from the moment they are queued
+            admit_queued_job(job)
+        except DownloadFailed as e:
+            self._handle_error(job, str(e))
+            get_job_journal().update(job, 'failed')
+            return
+        self.pending.append(job)
+        self._start_pending()
+
+    def set_max_workers(self, max_workers):
+        """
+        Change the number of concurrent downloads.
+        Running jobs are never interrupted, extra slots are filled right away.
+        """
+        self.max_workers = max(1, max_workers)
+        self._start_pending()
+
+    def active_count(self):
+        return len(self.workers) + len(self.expanding) + len(self.postprocessing)
+
+    def _start_pending(self):
+        while self.pending and len(self.workers) < self.max_workers:
+            job = self.pending.popleft()
+            worker = DownloadWorker(job)
+
+            worker.progress_updated.connect(lambda d, job=job: self.job_progress.emit(job, d))
+            worker.status_changed.connect(lambda text, job=job: self.job_status.emit(job, text))
+            worker.download_finished.connect(lambda title, job=job: self._handle_finished(job, title))
+            worker.error_occurred.connect(lambda error, job=job: self._handle_error(job, error))
+            worker.entry_found.connect(lambda entry, job=job: self._handle_entry(job, entry))
+            worker.postprocessing_started.connect(lambda future, job=job: self._handle_postprocessing(job, future))
+            worker.finished.connect(lambda job=job: self._handle_worker_done(job))
+
+            job.state = 'downloading'
+            self.workers[job.job_id] = (job, worker)
+            self.job_started.emit(job)
+            worker.start()
+        self.queue_changed.emit(self.active_count(), len(self.pending))
+
+    def _handle_entry(self, job, entry):
+        if job.job_id in self.workers:
+            # Listing a long channel must not hold up a download slot
+            self.expanding[job.job_id] = self.workers.pop(job.job_id)
+        self._enqueue(entry)
+
+    def _handle_postprocessing(self, job, future):
+        # The worker slot is released as soon as its thread stops, the merge goes on in the pool
+        self.postprocessing[job.job_id] = job
+        self.job_status.emit(job, "Merging...")
+        future.add_done_callback(lambda future, job=job: self._postprocess_done.emit(job, future))
+
+    def _handle_postprocess_done(self, job, future):
+        self.postprocessing.pop(job.job_id, None)
+        try:
+            self._handle_finished(job, future.result())
+        except DownloadFailed as e:
+            self._handle_error(job, str(e))
+        self.queue_changed.emit(self.active_count(), len(self.pending))
+
+    def _handle_finished(self, job, title):
+        job.title = title
+        job.state = 'finished'
+        self.job_finished.emit(job)
+
+    def _handle_error(self, job, error):
+        job.error = error
+        job.state = 'failed'
+        self.job_failed.emit(job, error)
+
+    def _handle_worker_done(self, job):
+        # The QThread has fully stopped, its slot can go to the next job
+        _, worker = self.workers.pop(job.job_id, None) or self.expanding.pop(job.job_id, (None, None))
+        if worker is not None:
+            worker.deleteLater()
+        self._start_pending()
@@ -0,0 +1,35 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from downloader_core import run_download, DownloadFailed
+
+
+class DownloadWorker(QThread):
+    """
+    Background thread for running a download to prevent UI freezing
+    """
+    progress_updated = pyqtSignal(dict)
+    status_changed = pyqtSignal(str)
+    download_finished = pyqtSignal(str)
+    error_occurred = pyqtSignal(str)
+    entry_found = pyqtSignal(object)  # DownloadJob for each video of a playlist
+    postprocessing_started = pyqtSignal(object)  # Future of the merge left to the postprocess pool
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def run(self):
+        try:
+            video_title = run_download(
+                self.job,
+                on_progress=self.progress_updated.emit,
+                on_status=self.status_changed.emit,
+                on_entry=self.entry_found.emit,
+                defer_postprocessing=True
+            )
+            if self.job.postprocess_future is not None:
+                self.postprocessing_started.emit(self.job.postprocess_future)
+            else:
+                self.download_finished.emit(video_title)
+        except DownloadFailed as e:
+            self.error_occurred.emit(str(e))
@@ -0,0 +1,750 @@
+# downloader_core.py
+# Qt-free download logic shared by the GUI and the command line interface.
+# Nothing in here may import PyQt5.
+import itertools
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+from utils import sanitize_filename, strip_ansi_codes
+from info_cache import info_cache
+from metadata_cache import get_metadata_cache
+from progress_aggregator import ProgressAggregator, bandwidth_meter
+from format_ranking import best_audio, select_format
+from fragment_tuner import get_fragment_tuner, uses_fragments, site_key, RetryCountingLogger
+from job_journal import get_job_journal
+from bandwidth_manager import bandwidth_manager, LIMITED_BUFFER_SIZE
+from disk_space import disk_space, estimate_job_bytes, DiskSpaceError
+from download_archive import get_download_archive, video_key_from_url
+from remux import plan_output, DEFAULT_CONTAINER
+from postprocess_pool import (
+    get_postprocess_pool, ffmpeg_available, merged_extension, merged_path, merge_parts, container_postprocessor
+)
+from job_metrics import JobMetrics, job_metrics
+
+
+# Used when a job has neither a selected format nor an explicit format spec
+DEFAULT_FORMAT_SPEC = 'bestvideo*+bestaudio/best'
+# Policy for playlist entries when the playlist job has neither a policy nor a format spec
+DEFAULT_PLAYLIST_POLICY = 'best'
+# Output templates must end like this for the streams to be downloaded separately
+_EXT_SUFFIX = '.%(ext)s'
+# What the sites answer when a format URL from an earlier extraction has expired
+_EXPIRED_URL_STATUSES = (403, 410)
+_EXPIRED_URL_MESSAGE = re.compile(r'HTTP Error (?:403|410)\b|\bexpired\b', re.IGNORECASE)
+
+
+class DownloadFailed(Exception):
+    """
+    Raised by run_download with a message that can be shown to the user as is
+    """
+
+
+class DownloadJob:
+    """
+    A single download: a URL plus the chosen format
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, url, selected_format=None, output_dir='.', format_spec=None, format_policy=None,
+                 title=None, outtmpl=None):
+        """
+        :param url: Video URL
+        :param selected_format: Enhanced format dict picked in the format dialog, if any
+        :param output_dir: Directory the file is written to
+        :param format_spec: yt-dlp format selector used when no format was picked
+        :param format_policy: format_ranking policy string used when no format was picked
+        :param title: Title to show until the real one is known, e.g. from a playlist entry
+        :param outtmpl: yt-dlp output template, defaults to the title inside output_dir
+        """
+        self.job_id = next(self._ids)
+        self.url = url
+        self.selected_format = selected_format
+        self.output_dir = output_dir
+        self.format_spec = format_spec
+        self.format_policy = format_policy
+        self.outtmpl = outtmpl or f"{output_dir}/%(title).100s.%(ext)s"
+        self.container = DEFAULT_CONTAINER  # Preferred output container
+        self.strict_container = False  # Transcode when the codecs don't fit the container
+        self.state = 'queued'  # queued -> downloading -> (postprocessing ->) finished / failed
+        self.title = title or url
+        self.error = None
+        self.playlist_size = None  # Number of entries queued when the URL was a playlist
+        self.use_archive = True  # Skip videos the download archive already has in this format
+        self.skipped = False  # Set when the archive already had it
+        self.journal_id = None  # Row in the job journal once recorded
+        self.source = None  # Who recorded it in the journal, 'gui' or 'cli'
+        self.parent_id = None  # Journal row of the playlist this job came from
+        self.postprocess_future = None  # Set when merging was handed to the postprocess pool
+        self.metrics = JobMetrics()  # Phase timings, bytes and retries, see job_metrics
+
+
+def unique_formats(formats):
+    """
+    Drop formats with a format_id that was already seen, keeping the original order.
+    """
+    unique = []
+    format_ids = set()
+    for fmt in formats:
+        if fmt['format_id'] not in format_ids:
+            unique.append(fmt)
+            format_ids.add(fmt['format_id'])
+    return unique
+
+
+def is_playlist(info_dict):
+    return info_dict.get('_type') in ('playlist', 'multi_video')
+
+
+# URL -> Event set when the extraction running for it ends, see extract_info
+_extractions = {}
+_extractions_lock = threading.Lock()
+
+
+def extract_info(url, quiet=True):
+    """
+    Extract the info dict for url and store it in both caches. When another
+    thread is already extracting url, e.g. the format prefetch, wait for it
+    and use its result instead of extracting the same URL twice.
+
+    Playlists and channels are only listed flat: their info dict is returned
+    as is, with entries as a lazy iterable of URL stubs that fetches further
+    pages while it is consumed. Playlist info is never cached.
+
+    :return: A sanitized info dict owned by the caller
+    """
+    key = url.strip()
+    with _extractions_lock:
+        running = _extractions.get(key)
+        if running is None:
+            _extractions[key] = threading.Event()
+    if running is not None:
+        running.wait()
+        info_dict = info_cache.get(url)
+        # Playlists are not cached and failed extractions left nothing, try again
+        return info_dict if info_dict is not None else extract_info(url, quiet)
+    try:
+        return _extract_info(url, quiet)
+    finally:
+        with _extractions_lock:
+            _extractions.pop(key).set()
+
+
+def _extract_info(url, quiet):
+    # The extraction itself, from the network
+
+    import yt_dlp
+    with yt_dlp.YoutubeDL({'quiet': quiet, 'extract_flat': 'in_playlist'}) as ydl:
+        info_dict = ydl.extract_info(url, download=False, process=False)
+        # Follow plain redirects unprocessed, they may lead to a playlist
+        while info_dict and info_dict.get('_type') == 'url':
+            info_dict = ydl.extract_info(
+                info_dict['url'], ie_key=info_dict.get('ie_key'), download=False, process=False
+            )
+        if not info_dict:
+            raise DownloadFailed("Video information could not be retrieved.")
+        if is_playlist(info_dict):
+            return info_dict
+
+        info_dict = ydl.process_ie_result(info_dict, download=False)
+        if is_playlist(info_dict):
+            return info_dict
+
+        # Keep the info so the download does not extract it again
+        info_dict = ydl.sanitize_info(info_dict)
+        info_cache.put(url, info_dict)
+        get_metadata_cache().put(url, info_dict)
+        return info_dict
+
+
+def iter_playlist_entries(info_dict):
+    """
+    Yield (url, title) for every video of a flat playlist info dict, in order.
+    Entries are pulled one at a time, so large channels yield their first
+    videos after the first page is listed.
+    """
+    for entry in info_dict.get('entries') or ():
+        if not entry:
+            continue
+        if is_playlist(entry):
+            yield from iter_playlist_entries(entry)
+            continue
+        url = entry.get('url')
+        if not url or '://' not in url:
+            # Some extractors only give an ID here
+            url = entry.get('webpage_url') or entry.get('original_url')
+        if url:
+            yield url, entry.get('title')
+
+
+def fetch_info(url, use_disk_cache=True):
+    """
+    Return the info dict for url: fresh in-memory info first, then the
+    on-disk format list, then the network.
+
+    :param url: Video URL
+    :param use_disk_cache: Allow the slim on-disk entry, which has no format URLs
+    """
+    info_dict = info_cache.get(url)
+    if info_dict is None and use_disk_cache:
+        info_dict = get_metadata_cache().get(url)
+    if info_dict is None:
+        info_dict = extract_info(url)
+    return info_dict
+
+
+def fetch_formats(url, use_disk_cache=True):
+    """
+    Return the de-duplicated list of formats available for url.
+
+    :param use_disk_cache: Allow the on-disk format list, see fetch_info
+    :raises DownloadFailed: When url is a playlist
+    """
+    info_dict = fetch_info(url, use_disk_cache)
+    if is_playlist(info_dict):
+        raise DownloadFailed(
+            "This URL is a playlist. Choose an automatic format and press Download to queue all of its videos."
+        )
+    return unique_formats(info_dict.get('formats', []))
+
+
+def enhance_formats_with_audio(formats):
+    """
+    Advanced format enhancement with comprehensive audio handling:
+    1. Categorize formats into video, audio, mixed, and unknown streams
+    2. Implement strategies for audio extraction and merging
+    3. Add comprehensive audio status and merging information
+    4. Include unknown formats with descriptive annotations
+
+    Runs in a single pass over formats. Audio streams are grouped once by
+    extension and every video-only format references the shared group as its
+    potential_audio list, so memory stays linear in the number of formats.
+    Callers must treat potential_audio lists as read-only.
+    """
+    mixed_formats = []
+    video_only_formats = []
+    audio_formats = []
+    audio_only_formats = []
+    unknown_formats = []
+    audio_by_ext = {}
+
+    for fmt in formats:
+        has_video = fmt.get('vcodec', 'none') != 'none'
+        has_audio = fmt.get('acodec', 'none') != 'none'
+
+        if has_video and has_audio:
+            # Video with built-in audio
+            enhanced_fmt = fmt.copy()
+            enhanced_fmt['media_type'] = 'Video + Audio'
+            enhanced_fmt['audio_status'] = 'Built-in Audio'
+            enhanced_fmt['audio_extraction'] = True
+            mixed_formats.append(enhanced_fmt)
+        elif has_video:
+            # Video without audio, audio status is filled in once all audio is known
+            video_only_formats.append(fmt.copy())
+        elif has_audio:
+            # Pure audio
+            audio_formats.append(fmt)
+            audio_by_ext.setdefault(fmt.get('ext'), []).append(fmt)
+            enhanced_fmt = fmt.copy()
+            enhanced_fmt['media_type'] = 'Audio Only'
+            enhanced_fmt['audio_status'] = 'MP3/Audio Extraction'
+            enhanced_fmt['is_audio_only'] = True
+            audio_only_formats.append(enhanced_fmt)
+        elif fmt.get('format_id', 'unknown') != 'unknown':
+            # Unknown stream
+            enhanced_fmt = fmt.copy()
+            enhanced_fmt['media_type'] = 'Unknown Format'
+            enhanced_fmt['audio_status'] = 'Unidentified Stream'
+            enhanced_fmt['format_details'] = {
+                'ext': fmt.get('ext', 'Unknown'),
+                'height': fmt.get('height', 'N/A'),
+                'fps': fmt.get('fps', 'N/A')
+            }
+            unknown_formats.append(enhanced_fmt)
+
+    for enhanced_fmt in video_only_formats:
+        # Prefer audio with the same extension, otherwise any audio stream
+        compatible_audio = audio_by_ext.get(enhanced_fmt.get('ext')) or audio_formats
+
+        if compatible_audio:
+            # Can merge audio
+            enhanced_fmt['media_type'] = 'Video (Add Audio)'
+            enhanced_fmt['audio_status'] = f'Merge with {len(compatible_audio)} audio streams'
+            enhanced_fmt['potential_audio'] = compatible_audio
+            enhanced_fmt['audio_merging'] = True
+        else:
+            # No audio available
+            enhanced_fmt['media_type'] = 'Video (No Audio)'
+            enhanced_fmt['audio_status'] = 'No Audio Streams'
+            enhanced_fmt['audio_merging'] = False
+
+    # Same order as always: mixed, video-only, audio-only, unknown
+    return mixed_formats + video_only_formats + audio_only_formats + unknown_formats
+
+
+def build_format_spec(selected_format=None, format_spec=None):
+    """
+    Turn a selected (enhanced) format into a yt-dlp format selector.
+    Video-only formats are paired with their best compatible audio stream.
+    """
+    if not selected_format:
+        return format_spec or DEFAULT_FORMAT_SPEC
+    audio = best_audio(selected_format)
+    if audio is not None:
+        return f"{selected_format['format_id']}+{audio['format_id']}"
+    return selected_format['format_id']
+
+
+def resolve_job_format(job, video_info):
+    """
+    Pick the format for a job queued with a format policy instead of a selected format.
+
+    :raises DownloadFailed: When no format satisfies the policy
+    """
+    if job.selected_format or not job.format_policy:
+        return
+    formats = enhance_formats_with_audio(unique_formats(video_info.get('formats') or []))
+    # Without ffmpeg only formats that need no merging can be downloaded
+    can_merge = ffmpeg_available()
+    chosen = select_format(
+        formats, job.format_policy,
+        duration=video_info.get('duration'),
+        bandwidth=bandwidth_meter.estimate(),
+        can_merge=can_merge
+    )
+    if chosen is None:
+        hint = "" if can_merge else " without merging; install ffmpeg to merge video and audio streams"
+        raise DownloadFailed(f"No format matches the policy '{job.format_policy}'{hint}.")
+    job.selected_format = chosen
+
+
+def can_defer_merge(job):
+    """
+    Whether the job's video and audio streams can be downloaded as separate
+    files and merged afterwards in the postprocess pool.
+    """
+    return (
+        bool(job.selected_format) and best_audio(job.selected_format) is not None
+        and job.outtmpl.endswith(_EXT_SUFFIX) and ffmpeg_available()
+    )
+
+
+def build_ydl_opts(job, progress_hooks=(), quiet=False, fragment_workers=None, logger=None, post_hooks=(),
+                   split_streams=False, postprocessor_hooks=()):
+    """
+    Prepare yt-dlp options for a job.
+
+    :param job: DownloadJob to run
+    :param progress_hooks: yt-dlp progress hook callables
+    :param quiet: Silence yt-dlp console output, e.g. when stdout carries JSON
+    :param fragment_workers: Fragments downloaded in parallel for HLS/DASH formats
+    :param logger: yt-dlp logger object replacing console output
+    :param post_hooks: Called with the final file path once postprocessing is done
+    :param split_streams: Download video and audio as separate files and leave merging
+                          to the caller, see can_defer_merge
+    :param postprocessor_hooks: yt-dlp postprocessor hook callables
+    """
+    merge_output_format = None
+    if job.selected_format:
+        # Stream copy into the container whenever the codecs allow it
+        merge_output_format = plan_output(
+            job.selected_format, best_audio(job.selected_format), job.container, job.strict_container
+        )
+    ydl_opts = {
+        'format': build_format_spec(job.selected_format, job.format_spec),
+        'outtmpl': job.outtmpl,
+        'progress_hooks': list(progress_hooks),
+        'post_hooks': list(post_hooks),
+        'postprocessor_hooks': list(postprocessor_hooks),
+    }
+    if split_streams:
+        # One file per stream, named like yt-dlp names the parts it merges itself
+        audio = best_audio(job.selected_format)
+        ydl_opts['format'] = f"{job.selected_format['format_id']},{audio['format_id']}"
+        ydl_opts['outtmpl'] = job.outtmpl[:-len(_EXT_SUFFIX)] + '.f%(format_id)s' + _EXT_SUFFIX
+    elif merge_output_format:
+        ydl_opts['merge_output_format'] = merge_output_format
+    if quiet:
+        ydl_opts.update({'quiet': True, 'noprogress': True, 'no_warnings': True})
+    if fragment_workers:
+        ydl_opts['concurrent_fragment_downloads'] = fragment_workers
+    if bandwidth_manager.is_limited():
+        # Small fixed reads let the rate limiter sleep often and briefly
+        ydl_opts.update({'buffersize': LIMITED_BUFFER_SIZE, 'noresizebuffer': True})
+    if logger is not None:
+        ydl_opts['logger'] = logger
+    return ydl_opts
+
+
+def expand_playlist(job, info_dict, on_entry, on_status=None):
+    """
+    Hand every entry of a playlist job to on_entry as a new DownloadJob.
+    Entries are not extracted here, each one is resolved when it is downloaded.
+
+    :return: The sanitized playlist title
+    """
+    playlist_title = sanitize_filename(info_dict.get('title') or job.url)
+    job.title = playlist_title
+    job.playlist_size = 0
+    # A resumed playlist only queues the entries it had not reached before
+    journal = get_job_journal()
+    known_urls = journal.entry_urls(job.journal_id) if job.journal_id is not None else set()
+    # An explicit format spec (CLI -f) applies to every entry as is
+    format_policy = job.format_policy or (None if job.format_spec else DEFAULT_PLAYLIST_POLICY)
+    for url, title in iter_playlist_entries(info_dict):
+        job.playlist_size += 1
+        if url in known_urls:
+            continue
+        entry = DownloadJob(
+            url, output_dir=job.output_dir, format_spec=job.format_spec,
+            format_policy=format_policy, title=title
+        )
+        if job.journal_id is not None:
+            # Recorded here, on the worker thread, so long playlists don't block the caller
+            entry.parent_id = job.journal_id
+            journal.add(entry, job.source)
+        on_entry(entry)
+        if on_status is not None:
+            on_status(f"Queued {job.playlist_size} videos")
+    return playlist_title
+
+
+def archive_format_key(job):
+    """
+    What the archive remembers about the format choice: the policy or format
+    selector the job was queued with, or the exact format ids picked by hand.
+    """
+    if job.format_policy:
+        return f"policy:{job.format_policy}"
+    if job.selected_format:
+        return build_format_spec(job.selected_format)
+    return f"spec:{build_format_spec(None, job.format_spec)}"
+
+
+def find_archived_url(url, format_key):
+    """
+    Return the archived title when url was already downloaded in this format,
+    using only the URL itself, the archive's URL index and the metadata cache.
+    """
+    archive = get_download_archive()
+    video_key = video_key_from_url(url) or archive.lookup_url(url)
+    if video_key is None:
+        slim_info = get_metadata_cache().get(url)
+        if slim_info and slim_info.get('id'):
+            video_key = (slim_info.get('extractor_key') or slim_info.get('extractor') or 'generic', slim_info['id'])
+    if video_key is None:
+        return None
+    return archive.find(video_key[0], video_key[1], format_key)
+
+
+def _info_video_key(video_info):
+    extractor = video_info.get('extractor_key') or video_info.get('extractor') or 'generic'
+    return extractor, video_info.get('id')
+
+
+def is_expired_url_error(error):
+    """
+    Whether a yt-dlp DownloadError says the format URL is no longer valid
+    (HTTP 403/410 or an expiry message), so a fresh extraction can fix it
+    """
+    cause = error.exc_info[1] if error.exc_info else None
+    status = getattr(cause, 'status', None) or getattr(cause, 'code', None)
+    if status in _EXPIRED_URL_STATUSES:
+        return True
+    return bool(_EXPIRED_URL_MESSAGE.search(strip_ansi_codes(str(error))))
+
+
+def admit_queued_job(job):
+    """
+    Reserve disk space for a job that is queued with a hand-picked format.
+
+    :raises DownloadFailed: When it can't fit next to the jobs already admitted
+    """
+    size = estimate_job_bytes(job.selected_format)
+    if not size:
+        return
+    try:
+        disk_space.reserve(job.job_id, job.output_dir, size)
+    except DiskSpaceError as e:
+        raise DownloadFailed(str(e))
+
+
+def page_host(video_info, url=None):
+    """
+    Host name of the video's page, for per-host bandwidth caps. The page host
+    is what users know; the CDN host of the media changes from one video to the next.
+    """
+    return urlparse(video_info.get('webpage_url') or url or '').hostname
+
+
+def resume_unfinished_jobs(source):
+    """
+    Return new DownloadJobs for the journal entries of source that were queued
+    or running when the app last stopped. yt-dlp continues their .part files.
+    """
+    journal = get_job_journal()
+    journal.prune()
+    jobs = []
+    for row in journal.unfinished(source):
+        job = DownloadJob(
+            row['url'], row['selected_format'], row['output_dir'], row['format_spec'], row['format_policy'],
+            title=row['title'], outtmpl=row['outtmpl']
+        )
+        job.journal_id = row['journal_id']
+        job.parent_id = row['parent_id']
+        job.source = source
+        jobs.append(job)
+    return jobs
+
+
+def run_download(job, on_progress=None, on_status=None, quiet=False, on_entry=None, defer_postprocessing=False):
+    """
+    Download a job on the calling thread, keeping its journal entry up to date.
+
+    :param job: DownloadJob to run
+    :param on_progress: Called with rate-limited ProgressAggregator snapshots
+    :param on_status: Called with short human readable status messages
+    :param quiet: Silence yt-dlp console output
+    :param on_entry: Called with a new DownloadJob for every video when the URL is a playlist
+    :param defer_postprocessing: Return once the streams are downloaded and merge them in the
+                                 postprocess pool. The job is only done when job.postprocess_future is,
+                                 which resolves to the title or raises DownloadFailed.
+    :return: The sanitized video title, or the playlist title
+    :raises DownloadFailed: With a user facing message when the download fails
+    """
+    journal = get_job_journal()
+    journal.update(job, 'running')
+    job.metrics.add('queue_wait', time.monotonic() - job.metrics.queued_at)
+    try:
+        title = _run_download(job, on_progress, on_status, quiet, on_entry, defer_postprocessing)
+    except DownloadFailed as e:
+        job.error = str(e)
+        journal.update(job, 'failed')
+        job_metrics.record(job, 'failed')
+        raise
+    finally:
+        if job.postprocess_future is None:
+            # Also drops the reservation made when the job was queued
+            disk_space.release(job.job_id)
+    if job.postprocess_future is not None:
+        return title
+    if job.skipped:
+        outcome = 'skipped'
+    else:
+        outcome = 'expanded' if job.playlist_size is not None else 'finished'
+    journal.update(job, outcome)
+    job_metrics.record(job, outcome)
+    return title
+
+
+def _postprocess_job(job, parts, output_path, container, quiet, on_merged, submitted):
+    # Runs in the postprocess pool; the disk reservation is held until the parts are gone
+    job.metrics.add('queue_wait', time.monotonic() - submitted)
+    journal = get_job_journal()
+    try:
+        with job.metrics.phase('postprocess'):
+            filepath = merge_parts(parts, output_path, container, quiet)
+        on_merged(filepath)
+    except Exception as e:
+        job.state = 'failed'
+        job.error = f"Merging failed: {strip_ansi_codes(str(e))}"
+        journal.update(job, 'failed')
+        job_metrics.record(job, 'failed')
+        raise DownloadFailed(job.error)
+    finally:
+        disk_space.release(job.job_id)
+    job.state = 'finished'
+    journal.update(job, 'finished')
+    job_metrics.record(job, 'finished')
+    return job.title
+
+
+def _run_download(job, on_progress, on_status, quiet, on_entry, defer_postprocessing):
+    import yt_dlp
+
+    progress = ProgressAggregator()
+    transfer = {'bytes': 0, 'started': None, 'ended': None}
+
+    def progress_hook(d):
+        now = time.monotonic()
+        if transfer['started'] is None:
+            transfer['started'] = now
+        transfer['ended'] = now
+        if d.get('status') == 'finished':
+            transfer['bytes'] += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            disk_space.update(job.job_id, transfer['bytes'])
+        elif d.get('status') == 'downloading':
+            disk_space.update(job.job_id, transfer['bytes'] + (d.get('downloaded_bytes') or 0))
+
+        snapshot = progress.update(d)
+        if snapshot is not None and on_progress is not None:
+            on_progress(snapshot)
+
+    final_paths = []
+    # Inline postprocessing time, and when the last file was in place, for the job metrics
+    finalizing = {'postprocess': 0.0, 'running': {}, 'done': None}
+
+    def postprocessor_hook(d):
+        name = d.get('postprocessor')
+        if d.get('status') == 'started':
+            finalizing['running'][name] = time.monotonic()
+        elif d.get('status') == 'finished' and name in finalizing['running']:
+            seconds = time.monotonic() - finalizing['running'].pop(name)
+            # Moving the finished file counts as writing it
+            if name != 'MoveFiles':
+                finalizing['postprocess'] += seconds
+                job.metrics.add('postprocess', seconds)
+
+    def post_hook(filepath):
+        final_paths.append(filepath)
+        finalizing['done'] = time.monotonic()
+
+    def skip(title):
+        job.skipped = True
+        job.title = title
+        if on_status is not None:
+            on_status("Already downloaded, skipped")
+        return title
+
+    tuning = None  # (site, fragment workers, logger) for HLS/DASH downloads
+    active_download = None  # fragment_tuner.ActiveDownload while the transfer runs
+    format_key = archive_format_key(job)
+    try:
+        # Known duplicates are skipped before any network access
+        archived_title = find_archived_url(job.url, format_key) if job.use_archive else None
+        if archived_title is not None:
+            return skip(archived_title)
+
+        # Reuse the info dict from the format fetch when it is still fresh
+        video_info = info_cache.get(job.url)
+        from_cache = video_info is not None
+        if not from_cache:
+            with job.metrics.phase('extract'):
+                video_info = extract_info(job.url, quiet)
+        job.metrics.site = site_key(video_info)
+
+        if is_playlist(video_info):
+            if on_entry is None:
+                raise DownloadFailed("This URL is a playlist, queue it again to download its videos.")
+            return expand_playlist(job, video_info, on_entry, on_status)
+
+        extractor, video_id = _info_video_key(video_info)
+        if job.use_archive and video_id:
+            archived_title = get_download_archive().find(extractor, video_id, format_key)
+            if archived_title is not None:
+                # Remember this URL so the next run skips it without extracting
+                get_download_archive().remember_urls(extractor, video_id, [job.url])
+                return skip(archived_title)
+
+        # Jobs queued with a policy get their format now that the formats are known
+        resolve_job_format(job, video_info)
+        # A restart resumes with this exact format, so the .part file still matches
+        get_job_journal().update(job, 'running')
+
+        # Fail now rather than on a full disk after the bandwidth is spent
+        try:
+            disk_space.reserve(
+                job.job_id, job.output_dir,
+                estimate_job_bytes(job.selected_format, video_info.get('duration')),
+                preallocate=True
+            )
+        except DiskSpaceError as e:
+            raise DownloadFailed(str(e))
+
+        video_title = sanitize_filename(video_info.get('title', 'Unknown Title'))
+        job.title = video_title
+        if on_status is not None:
+            on_status(f"Downloading: {video_title}")
+
+        # Counts retries for the job metrics and fragment errors for the tuner
+        logger = RetryCountingLogger(quiet)
+        fragment_workers = None
+        if uses_fragments(video_info, job.selected_format):
+            # Fragment concurrency is tuned per site from earlier downloads
+            site = job.metrics.site
+            fragment_workers = get_fragment_tuner().choose(site)
+            tuning = (site, fragment_workers, logger)
+
+        # Shares the global and per-host bandwidth limits with the other running jobs
+        throttle = bandwidth_manager.register(job.job_id, page_host(video_info, job.url))
+        hooks = [bandwidth_manager.progress_hook(throttle), progress_hook]
+        # Merging in the postprocess pool frees this worker for the next download
+        split_streams = defer_postprocessing and can_defer_merge(job)
+        ydl_opts = build_ydl_opts(
+            job, hooks, quiet, fragment_workers, logger, [post_hook], split_streams, [postprocessor_hook]
+        )
+        try:
+            # Every download counts, progressive ones share the site's link with fragmented ones too
+            active_download = get_fragment_tuner().download_started(job.metrics.site)
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                if job.strict_container and not split_streams:
+                    # Decides from the downloaded codecs what has to be converted
+                    ydl.add_post_processor(container_postprocessor(ydl, job.container))
+                # Start downloading from the already extracted info
+                try:
+                    ydl.process_ie_result(video_info, download=True)
+                except yt_dlp.utils.DownloadError as e:
+                    if not from_cache or not is_expired_url_error(e):
+                        raise
+                    # The cached format URLs have expired, extract once more
+                    info_cache.invalidate(job.url)
+                    ydl.extract_info(job.url, download=True)
+        finally:
+            bandwidth_manager.unregister(job.job_id)
+            if active_download is not None:
+                get_fragment_tuner().download_finished(active_download)
+            job.metrics.retries = logger.errors
+
+        if transfer['started'] is not None:
+            elapsed = transfer['ended'] - transfer['started']
+            bandwidth_meter.record(transfer['bytes'], elapsed)
+            job.metrics.add('download', elapsed)
+            job.metrics.bytes = transfer['bytes']
+            if finalizing['done'] is not None:
+                job.metrics.add('disk_write', finalizing['done'] - transfer['ended'] - finalizing['postprocess'])
+            if tuning is not None and not bandwidth_manager.is_limited():
+                # Throttled transfers say nothing about what more fragment workers would do
+                site, fragment_workers, logger = tuning
+                get_fragment_tuner().report(
+                    site, fragment_workers, transfer['bytes'], elapsed, logger.errors, active_download.shared
+                )
+
+        def record_archive(filepath):
+            if video_id:
+                get_download_archive().record(
+                    extractor, video_id, format_key, filepath, video_title,
+                    urls=[job.url, video_info.get('webpage_url')]
+                )
+
+        if split_streams:
+            if len(final_paths) != 2:
+                raise DownloadFailed("Download failed: the video or audio stream is missing.")
+            audio = best_audio(job.selected_format)
+            merge_output_format = plan_output(job.selected_format, audio, job.container, job.strict_container)
+            ext = merged_extension(job.selected_format, audio, merge_output_format)
+            output_path = merged_path(final_paths[0], job.selected_format['format_id'], ext)
+            job.state = 'postprocessing'
+            if on_status is not None:
+                on_status(f"Merging: {video_title}")
+            job.postprocess_future = get_postprocess_pool().submit(
+                _postprocess_job, job, list(zip(final_paths, (job.selected_format, audio))),
+                output_path, job.container if job.strict_container else None, quiet, record_archive,
+                time.monotonic()
+            )
+            return video_title
+
+        record_archive(final_paths[-1] if final_paths else None)
+        return video_title
+    except DownloadFailed:
+        raise
+    except yt_dlp.utils.DownloadError as e:
+        if tuning is not None:
+            site, fragment_workers, logger = tuning
+            get_fragment_tuner().report(site, fragment_workers, 0, 0, max(1, logger.errors))
+        if "private video" in str(e).lower() or "not available" in str(e).lower():
+            raise DownloadFailed("The video is private or not available for download.")
+        raise DownloadFailed(f"Download failed: {strip_ansi_codes(str(e))}")
+    except Exception as e:
+        raise DownloadFailed(f"An unexpected error occurred: {strip_ansi_codes(str(e))}")
@@ -16,7 +16,7 @@ def get_dark_theme_stylesheet():
         color: white;
         font-size: 14px;
     }
-    QTableWidget {
+    QTableView {
         background-color: #2a2a2a;
         color: white;
         alternate-background-color: #353535;
@@ -25,12 +25,12 @@ def get_dark_theme_stylesheet():
         border: 2px solid #4a4a4a;
         border-radius: 10px;
     }
-    QTableWidget::item {
+    QTableView::item {
         padding: 5px;
         border: 1px solid #4a4a4a;
         color: white;
     }
-    QTableWidget::item:selected {
+    QTableView::item:selected {
         background-color: #4CAF50;
         color: black;
     }
@@ -0,0 +1,134 @@
+from urllib.parse import urlparse
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from downloader_core import fetch_formats
+
+
+# Wait this long after the last edit of the URL box before fetching (milliseconds)
+PREFETCH_DELAY_MS = 600
+
+
+def looks_like_url(text):
+    """
+    Whether text is worth fetching: an http(s) URL with a host
+    """
+    try:
+        parsed = urlparse(text)
+    except ValueError:
+        return False
+    return parsed.scheme in ('http', 'https') and bool(parsed.hostname)
+
+
+class FormatFetchThread(QThread):
+    """
+    Background thread for fetching video formats to prevent UI freezing
+    """
+    formats_fetched = pyqtSignal(list)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, url, use_disk_cache=True):
+        super().__init__()
+        self.url = url
+        self.use_disk_cache = use_disk_cache
+
+    def run(self):
+        try:
+            self.formats_fetched.emit(fetch_formats(self.url, self.use_disk_cache))
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+class _Fetch:
+    # One fetch of one URL and the callbacks waiting for it
+    def __init__(self, url, generation, thread):
+        self.url = url
+        self.generation = generation
+        self.thread = thread
+        self.waiters = []  # (on_formats, on_error)
+
+
+class FormatPrefetcher(QObject):
+    """
+    Fetches the formats of the URL being typed or pasted while the user does
+    something else, so the format dialog usually opens without waiting.
+    Only the newest URL counts; results of older fetches are dropped.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(PREFETCH_DELAY_MS)
+        self._timer.timeout.connect(self._prefetch_pending_url)
+        self._pending_url = None
+        self._generation = 0
+        self._current = None  # _Fetch of the newest URL, running or finished
+        self._formats = None  # Formats of self._current once it succeeded
+        self._running = set()  # Threads are kept referenced until they stop
+
+    def url_changed(self, text):
+        """
+        Slot for the URL box: fetch once the text has stopped changing for a moment.
+        """
+        self._pending_url = text.strip()
+        self._timer.start()
+
+    def _prefetch_pending_url(self):
+        url = self._pending_url
+        if looks_like_url(url) and (self._current is None or self._current.url != url):
+            # Full extraction so the download can start from the cached info as well
+            self._start(url, use_disk_cache=False)
+
+    def is_ready(self, url):
+        """
+        Whether the formats of url are already fetched
+        """
+        return self._formats is not None and self._current.url == url.strip()
+
+    def request(self, url, on_formats, on_error):
+        """
+        Call on_formats with the formats of url, or on_error with a message.
+        Answers right away when they are fetched already, joins a fetch that is
+        still running, or starts a new one. Callbacks run on the GUI thread.
+        """
+        url = url.strip()
+        self._timer.stop()
+        if self.is_ready(url):
+            on_formats(self._formats)
+            return
+        fetch = self._current
+        if fetch is None or fetch.url != url or fetch.thread is None:
+            fetch = self._start(url)
+        fetch.waiters.append((on_formats, on_error))
+
+    def _start(self, url, use_disk_cache=True):
+        self._generation += 1
+        thread = FormatFetchThread(url, use_disk_cache)
+        fetch = _Fetch(url, self._generation, thread)
+        self._current = fetch
+        self._formats = None
+
+        thread.formats_fetched.connect(lambda formats, fetch=fetch: self._handle_done(fetch, formats=formats))
+        thread.error_occurred.connect(lambda error, fetch=fetch: self._handle_done(fetch, error=error))
+        thread.finished.connect(lambda thread=thread: self._handle_thread_done(thread))
+        self._running.add(thread)
+        thread.start()
+        return fetch
+
+    def _handle_done(self, fetch, formats=None, error=None):
+        fetch.thread = None
+        if fetch.generation == self._generation and error is None:
+            self._formats = formats
+        elif fetch.generation == self._generation:
+            # A failed prefetch is retried when the formats are asked for
+            self._current = None
+        for on_formats, on_error in fetch.waiters:
+            if error is None:
+                on_formats(formats)
+            else:
+                on_error(error)
+        fetch.waiters.clear()
+
+    def _handle_thread_done(self, thread):
+        self._running.discard(thread)
+        thread.deleteLater()
@@ -0,0 +1,222 @@
+# format_ranking.py
+# Automatic format selection for enhanced format lists (see
+# downloader_core.enhance_formats_with_audio). Qt-free.
+import re
+
+
+# Rough quality per bit relative to H.264, by vcodec prefix
+CODEC_EFFICIENCY = {
+    'av01': 1.6,
+    'hvc1': 1.4,
+    'hev1': 1.4,
+    'hevc': 1.4,
+    'h265': 1.4,
+    'vp09': 1.35,
+    'vp9': 1.35,
+    'avc1': 1.0,
+    'avc3': 1.0,
+    'h264': 1.0,
+    'vp8': 0.9,
+    'mp4v': 0.7,
+}
+DEFAULT_CODEC_EFFICIENCY = 0.8
+
+# Used for time budgets before any download has measured the real bandwidth (bytes/s)
+DEFAULT_BANDWIDTH = 1024 * 1024
+
+# (label shown in the GUI, policy string)
+POLICY_CHOICES = [
+    ("Best quality", "best"),
+    ("Best up to 1080p", "best-1080p"),
+    ("Best up to 720p", "best-720p"),
+    ("Smallest with audio", "smallest-with-audio"),
+    ("Audio only", "audio-only"),
+    ("Fit in 100 MB", "fit:100MB"),
+    ("Finish in 5 minutes", "time:5min"),
+]
+
+
+class FormatPolicy:
+    """
+    How to pick a format automatically
+    """
+    def __init__(self, name, prefer='quality', max_height=None, require_audio=True,
+                 audio_only=False, max_bytes=None, max_seconds=None):
+        """
+        :param name: Policy string this was parsed from
+        :param prefer: 'quality' for the best format, 'size' for the smallest
+        :param max_height: Skip video taller than this
+        :param require_audio: Only consider formats with audio or a stream to merge
+        :param audio_only: Only consider audio-only formats
+        :param max_bytes: Size budget for the whole download
+        :param max_seconds: Time budget, turned into bytes with the measured bandwidth
+        """
+        self.name = name
+        self.prefer = prefer
+        self.max_height = max_height
+        self.require_audio = require_audio
+        self.audio_only = audio_only
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+
+# A size without a unit is in MB, like the time budget's default of minutes
+_SIZE_UNITS = {'': 1024 ** 2, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2, 'g': 1024 ** 3, 'gb': 1024 ** 3}
+_TIME_UNITS = {'': 60, 's': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600}
+
+
+def parse_policy(text):
+    """
+    Parse a policy string:
+    best, best-<H>p, smallest-with-audio, audio-only, fit:<N>MB, time:<T>min
+    (a budget without unit is in MB or minutes)
+
+    :raises ValueError: For an unknown policy
+    """
+    text = (text or '').strip().lower()
+    if text == 'best':
+        return FormatPolicy(text)
+    match = re.fullmatch(r'best-(\d+)p', text)
+    if match:
+        return FormatPolicy(text, max_height=int(match.group(1)))
+    if text == 'smallest-with-audio':
+        return FormatPolicy(text, prefer='size')
+    if text == 'audio-only':
+        return FormatPolicy(text, audio_only=True)
+    match = re.fullmatch(r'fit:(\d+(?:\.\d+)?)\s*([kmg]?b?)', text)
+    if match:
+        return FormatPolicy(text, max_bytes=float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+    match = re.fullmatch(r'time:(\d+(?:\.\d+)?)\s*(s|sec|m|min|h)?', text)
+    if match:
+        return FormatPolicy(text, max_seconds=float(match.group(1)) * _TIME_UNITS[match.group(2) or ''])
+    raise ValueError(f"Unknown format policy: {text!r}")
+
+
+def codec_efficiency(vcodec):
+    vcodec = (vcodec or '').lower()
+    for prefix, efficiency in CODEC_EFFICIENCY.items():
+        if vcodec.startswith(prefix):
+            return efficiency
+    return DEFAULT_CODEC_EFFICIENCY
+
+
+def best_audio(fmt):
+    """
+    Return the highest bitrate audio stream a video-only format would be merged with, or None.
+    """
+    potential_audio = fmt.get('potential_audio')
+    if not potential_audio:
+        return None
+    return max(potential_audio, key=lambda x: x.get('abr') or 0)
+
+
+def _stream_size(fmt, duration):
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return size
+    bitrate = fmt.get('tbr') or fmt.get('abr')
+    if bitrate and duration:
+        return bitrate * 1000 / 8 * duration
+    return None
+
+
+def estimate_size(fmt, duration=None):
+    """
+    Estimate the bytes downloaded for an enhanced format, including the audio
+    stream merged into video-only formats. None when it cannot be estimated.
+    """
+    size = _stream_size(fmt, duration)
+    audio = best_audio(fmt)
+    if audio is not None and size is not None:
+        audio_size = _stream_size(audio, duration)
+        size = size + audio_size if audio_size is not None else None
+    return size
+
+
+def has_audio(fmt):
+    return fmt.get('acodec', 'none') != 'none' or bool(fmt.get('potential_audio'))
+
+
+def quality_score(fmt):
+    """
+    Sort key, higher is better: height, high frame rate, codec-adjusted bitrate, audio bitrate.
+    """
+    audio = best_audio(fmt)
+    abr = (audio or fmt).get('abr') or 0
+    if fmt.get('is_audio_only'):
+        return (0, 0, 0, abr)
+    height = fmt.get('height') if isinstance(fmt.get('height'), (int, float)) else 0
+    fps = fmt.get('fps') if isinstance(fmt.get('fps'), (int, float)) else 0
+    effective_bitrate = (fmt.get('tbr') or fmt.get('vbr') or 0) * codec_efficiency(fmt.get('vcodec'))
+    return (height, 1 if fps >= 50 else 0, effective_bitrate, abr)
+
+
+def rank_formats(formats, policy, duration=None, bandwidth=None, can_merge=True):
+    """
+    Return the formats allowed by the policy, best choice first.
+
+    :param formats: Enhanced format dicts
+    :param policy: FormatPolicy or policy string
+    :param duration: Video duration in seconds, used to estimate sizes from bitrates
+    :param bandwidth: Measured download speed in bytes/s for time budgets
+    :param can_merge: Whether ffmpeg is there to merge video-only formats with their audio
+    """
+    if isinstance(policy, str):
+        policy = parse_policy(policy)
+
+    candidates = []
+    silent = []
+    unknown = []
+    for fmt in formats:
+        if fmt.get('media_type') == 'Unknown Format':
+            # Streams without codec information, e.g. direct file links
+            unknown.append(fmt)
+            continue
+        if not can_merge and best_audio(fmt) is not None:
+            # Would need ffmpeg to merge in its audio
+            continue
+        if policy.audio_only:
+            if not fmt.get('is_audio_only'):
+                continue
+        elif fmt.get('is_audio_only'):
+            continue
+        height = fmt.get('height')
+        if policy.max_height and isinstance(height, (int, float)) and height > policy.max_height:
+            continue
+        if policy.require_audio and not policy.audio_only and not has_audio(fmt):
+            silent.append(fmt)
+            continue
+        candidates.append(fmt)
+
+    if not candidates and not policy.audio_only:
+        # Better a stream without (known) audio than nothing, e.g. direct file links
+        # where yt-dlp cannot tell which streams the file contains
+        candidates = silent or unknown
+
+    max_bytes = policy.max_bytes
+    if policy.max_seconds:
+        max_bytes = policy.max_seconds * (bandwidth or DEFAULT_BANDWIDTH)
+
+    if max_bytes:
+        sizes = {id(fmt): estimate_size(fmt, duration) for fmt in candidates}
+        fitting = [fmt for fmt in candidates if sizes[id(fmt)] is not None and sizes[id(fmt)] <= max_bytes]
+        if fitting:
+            return sorted(fitting, key=quality_score, reverse=True)
+        # Nothing fits the budget: the smallest known size comes closest
+        return sorted(candidates, key=lambda fmt: (sizes[id(fmt)] is None, sizes[id(fmt)] or 0))
+
+    if policy.prefer == 'size':
+        def size_key(fmt):
+            size = estimate_size(fmt, duration)
+            return (size is None, size or 0, tuple(-value for value in quality_score(fmt)))
+        return sorted(candidates, key=size_key)
+
+    return sorted(candidates, key=quality_score, reverse=True)
+
+
+def select_format(formats, policy, duration=None, bandwidth=None, can_merge=True):
+    """
+    Return the best format for the policy, or None if no format is allowed.
+    """
+    ranked = rank_formats(formats, policy, duration, bandwidth, can_merge)
+    return ranked[0] if ranked else None
@@ -0,0 +1,156 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QVariant
+from PyQt5.QtGui import QColor
+
+
+# Role returning the precomputed sort key of a cell
+SORT_ROLE = Qt.UserRole + 1
+
+COLUMNS = [
+    "Code", "Extension", "Resolution", "FPS", "Bitrate",
+    "Video Codec", "Media Type", "Audio Status"
+]
+AUDIO_STATUS_COLUMN = 7
+
+ADD_AUDIO_COLOR = QColor(100, 200, 100, 100)  # Light green
+NO_AUDIO_COLOR = QColor(200, 100, 100, 100)  # Light red
+
+
+def _number(value):
+    """
+    Numeric sort key, missing or non-numeric values sort first
+    """
+    return float(value) if isinstance(value, (int, float)) else -1.0
+
+
+def _code_key(format_id):
+    """
+    Sort key for format codes: numeric ids by value, then the named ones alphabetically
+    """
+    text = str(format_id)
+    return (0, int(text), '') if text.isdigit() else (1, 0, text.lower())
+
+
+class FormatTableModel(QAbstractTableModel):
+    """
+    Read-only table model over enhanced format records.
+    Cell texts and sort keys are computed once, views only ask for visible rows.
+    """
+    def __init__(self, formats, parent=None):
+        super().__init__(parent)
+        self.formats = formats
+        self.rows = [self._row_texts(fmt) for fmt in formats]
+        self.sort_keys = [self._row_sort_keys(fmt, texts) for fmt, texts in zip(formats, self.rows)]
+        # One lowercased search key per format; the separator keeps matches inside a single cell
+        self.search_keys = ["\n".join(texts).lower() for texts in self.rows]
+
+    def _row_texts(self, format_info):
+        # Prepare resolution with fallback
+        resolution = format_info.get('height', 'N/A')
+        resolution = f"{resolution}p" if isinstance(resolution, int) else str(resolution)
+
+        tbr = format_info.get('tbr')
+        bitrate = f"{tbr:.0f}k" if isinstance(tbr, (int, float)) else 'N/A'
+
+        return [
+            str(format_info.get('format_id', 'N/A')),
+            str(format_info.get('ext', 'N/A')),
+            resolution,
+            str(format_info.get('fps', 'N/A')),
+            bitrate,
+            str(format_info.get('vcodec', 'N/A')),
+            str(format_info.get('media_type', 'N/A')),
+            str(format_info.get('audio_status', 'N/A')),
+        ]
+
+    def _row_sort_keys(self, format_info, texts):
+        keys = [text.lower() for text in texts]
+        keys[0] = _code_key(format_info.get('format_id', 'N/A'))
+        keys[2] = _number(format_info.get('height'))
+        keys[3] = _number(format_info.get('fps'))
+        keys[4] = _number(format_info.get('tbr'))
+        return keys
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row, col = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return self.rows[row][col]
+        if role == SORT_ROLE:
+            return self.sort_keys[row][col]
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.BackgroundRole and col == AUDIO_STATUS_COLUMN:
+            # Color code audio status
+            text = self.rows[row][col]
+            if 'Add Audio' in text:
+                return ADD_AUDIO_COLOR
+            if 'No Audio' in text:
+                return NO_AUDIO_COLOR
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def format_at(self, row):
+        return self.formats[row]
+
+    def search_key(self, row):
+        return self.search_keys[row]
+
+    def sort_key(self, row, column):
+        return self.sort_keys[row][column]
+
+
+class FormatFilterProxyModel(QSortFilterProxyModel):
+    """
+    Sorts on the precomputed keys and filters on search text and media type
+    together, in a single pass over the rows
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.search_text = ''
+        self.media_filter = 'all'
+
+    def set_filters(self, search_text=None, media_filter=None):
+        """
+        Update either or both filters and re-evaluate the rows once.
+
+        :param search_text: Text to look for in any column, case insensitive
+        :param media_filter: One of 'all', 'video', 'audio', 'high_res'
+        """
+        if search_text is not None:
+            self.search_text = search_text.strip().lower()
+        if media_filter is not None:
+            self.media_filter = media_filter
+        self.invalidateFilter()
+
+    def lessThan(self, left, right):
+        # Compare the Python keys directly, numeric columns by value
+        model = self.sourceModel()
+        column = left.column()
+        return model.sort_key(left.row(), column) < model.sort_key(right.row(), column)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        model = self.sourceModel()
+        row_format = model.format_at(source_row)
+
+        if self.media_filter == 'video' and not row_format.get('media_type', '').startswith('Video'):
+            return False
+        if self.media_filter == 'audio' and row_format.get('media_type', '') != 'Audio Only':
+            return False
+        if self.media_filter == 'high_res':
+            height = row_format.get('height', 0)
+            if not (isinstance(height, int) and height >= 720):
+                return False
+
+        return not self.search_text or self.search_text in model.search_key(source_row)
@@ -0,0 +1,234 @@
+# fragment_tuner.py
+# Picks yt-dlp's concurrent_fragment_downloads per site for HLS/DASH downloads. Qt-free.
+import json
+import sys
+import threading
+from urllib.parse import urlparse
+
+from utils import app_data_path
+from format_ranking import best_audio
+
+
+MIN_FRAGMENT_WORKERS = 1
+START_FRAGMENT_WORKERS = 2
+MAX_FRAGMENT_WORKERS = 16
+# A probe with twice the workers is kept only when it is at least this much faster
+MIN_IMPROVEMENT = 1.10
+# A download this much slower than usual at the same setting counts as throttling
+THROTTLE_RATIO = 0.5
+# Short downloads are dominated by request latency and say little about throughput
+MIN_SAMPLE_BYTES = 4 * 1024 * 1024
+# Settled sites probe again after this many downloads, networks change
+REPROBE_AFTER = 20
+
+FRAGMENTED_PROTOCOLS = ('m3u8', 'http_dash_segments', 'dash', 'ism', 'f4m')
+
+
+def uses_fragments(video_info, selected_format=None):
+    """
+    Whether the download will most likely be fetched fragment by fragment.
+    Only the formats that get downloaded count: the selected format and the
+    audio merged with it, or else the formats yt-dlp picked when it processed
+    video_info. Storyboards and other unused formats are often fragmented.
+    """
+    if selected_format is not None:
+        formats = [fmt for fmt in (selected_format, best_audio(selected_format)) if fmt is not None]
+    else:
+        formats = video_info.get('requested_formats') or [video_info]
+    return any(
+        (fmt.get('protocol') or '').startswith(FRAGMENTED_PROTOCOLS) or fmt.get('fragments')
+        for fmt in formats
+    )
+
+
+def site_key(video_info):
+    """
+    Tuning key for a video: the extractor, or the host name for the generic extractor
+    """
+    extractor = video_info.get('extractor_key') or video_info.get('extractor') or ''
+    if extractor.lower() in ('', 'generic'):
+        return urlparse(video_info.get('webpage_url') or '').hostname or 'unknown'
+    return extractor
+
+
+def site_key_for_url(url):
+    """
+    site_key for a URL that was never extracted, e.g. a job that failed or was
+    skipped before extraction: the extractor that would handle it, else the host name
+    """
+    from download_archive import extractor_for_url
+    ie = extractor_for_url(url)
+    if ie is not None:
+        return ie.ie_key()
+    return urlparse(url).hostname or 'unknown'
+
+
+class ActiveDownload:
+    """
+    A download from a site while it runs. shared is set when another download
+    from the same site ran at the same time at any point.
+    """
+    def __init__(self, site):
+        self.site = site
+        self.shared = False
+
+
+class FragmentTuner:
+    """
+    Hill climbing over finished downloads, per site: start with a few workers,
+    double them while throughput keeps improving, go back on errors or throttling.
+    yt-dlp fixes the number of workers when a download starts, so every
+    download is one measurement. Downloads that shared the site with other
+    running downloads only count for their errors, their throughput depends
+    on what the others did.
+    """
+    def __init__(self, path=None):
+        """
+        :param path: JSON file the chosen values are kept in between runs
+        """
+        self.path = path or app_data_path('fragment_tuning.json')
+        self._lock = threading.Lock()
+        self._sites = self._load()
+        self._active = {}  # site -> ActiveDownloads running now
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self._sites, f)
+        except OSError as e:
+            print(f"Could not save fragment tuning: {e}", file=sys.stderr)
+
+    def choose(self, site):
+        """
+        Return the number of fragment workers for the next download from site.
+        """
+        with self._lock:
+            state = self._sites.get(site)
+            if state is None:
+                return START_FRAGMENT_WORKERS
+            if state['speed'] is None or state['settled']:
+                return state['workers']
+            # Probe the next step up
+            return min(MAX_FRAGMENT_WORKERS, state['workers'] * 2)
+
+    def download_started(self, site):
+        """
+        Track a download from site until download_finished, see ActiveDownload.
+        """
+        download = ActiveDownload(site)
+        with self._lock:
+            running = self._active.setdefault(site, [])
+            if running:
+                download.shared = True
+                for other in running:
+                    other.shared = True
+            running.append(download)
+        return download
+
+    def download_finished(self, download):
+        with self._lock:
+            running = self._active.get(download.site, [])
+            if download in running:
+                running.remove(download)
+            if not running:
+                self._active.pop(download.site, None)
+
+    def report(self, site, workers, num_bytes, seconds, errors=0, shared=False):
+        """
+        Record how a download from site went with the given number of workers.
+
+        :param errors: Failed or retried fragments, or 1 when the download failed
+        :param shared: Other downloads from site ran at the same time, see ActiveDownload
+        """
+        with self._lock:
+            state = self._sites.setdefault(
+                site, {'workers': START_FRAGMENT_WORKERS, 'speed': None, 'settled': False, 'runs': 0}
+            )
+            state['runs'] += 1
+            speed = num_bytes / seconds if seconds > 0 else 0
+
+            if errors:
+                if workers > state['workers']:
+                    # The probe was too much for the site, stay below it
+                    state['settled'] = True
+                else:
+                    state['workers'] = max(MIN_FRAGMENT_WORKERS, workers // 2)
+                    state['speed'] = None
+                    state['settled'] = True
+            elif shared or num_bytes < MIN_SAMPLE_BYTES:
+                # Siblings on the same link would look like throttling or hide an improvement
+                pass
+            elif workers > state['workers']:
+                if state['speed'] is None or speed >= state['speed'] * MIN_IMPROVEMENT:
+                    state['workers'] = workers
+                    state['speed'] = speed
+                    state['settled'] = workers >= MAX_FRAGMENT_WORKERS
+                else:
+                    state['settled'] = True
+            elif workers == state['workers']:
+                if state['speed'] is not None and speed < state['speed'] * THROTTLE_RATIO \
+                        and workers > MIN_FRAGMENT_WORKERS:
+                    # Throttled: fewer connections are often served faster
+                    state['workers'] = max(MIN_FRAGMENT_WORKERS, workers // 2)
+                    state['speed'] = None
+                    state['settled'] = True
+                elif state['speed'] is None:
+                    state['speed'] = speed
+                else:
+                    state['speed'] += 0.3 * (speed - state['speed'])
+
+            if state['settled'] and state['runs'] % REPROBE_AFTER == 0:
+                state['settled'] = False
+            self._save()
+
+
+class RetryCountingLogger:
+    """
+    yt-dlp logger that counts fragment errors and retries, and prints
+    messages the way yt-dlp itself would.
+    """
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.errors = 0
+
+    def debug(self, msg):
+        if msg.startswith('[download] Got error') or 'Skipping fragment' in msg:
+            self.errors += 1
+        if self.quiet or msg.startswith('[debug] '):
+            return
+        # Progress lines redraw themselves with a leading carriage return
+        print(msg, end='' if msg.startswith('\r') else '\n', flush=True)
+
+    def info(self, msg):
+        self.debug(msg)
+
+    def warning(self, msg):
+        if 'fragment' in msg.lower():
+            self.errors += 1
+        if not self.quiet:
+            print(f"WARNING: {msg}", file=sys.stderr)
+
+    def error(self, msg):
+        print(msg, file=sys.stderr)
+
+
+_fragment_tuner = None
+_fragment_tuner_lock = threading.Lock()
+
+
+def get_fragment_tuner():
+    """
+    Return the shared FragmentTuner, loading it on first use
+    """
+    global _fragment_tuner
+    with _fragment_tuner_lock:
+        if _fragment_tuner is None:
+            _fragment_tuner = FragmentTuner()
+        return _fragment_tuner
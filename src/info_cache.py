@@ -0,0 +1,67 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+# Format URLs handed out by most sites stay valid for at least this long
+DEFAULT_TTL = 30 * 60
+DEFAULT_MAX_ENTRIES = 64
+
+
+class InfoCache:
+    """
+    Thread-safe in-memory cache of yt-dlp info dicts keyed by URL,
+    with TTL expiry and least-recently-used eviction.
+    """
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param ttl: Seconds an entry stays usable after it was stored
+        :param max_entries: Number of entries kept before the least recently used is evicted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # url -> (stored_at, info_dict)
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """
+        Return a private copy of the cached info dict for url, or None.
+        yt-dlp mutates info dicts while processing them, so callers never
+        get the cached object itself.
+        """
+        key = url.strip()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, info_dict = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(info_dict)
+
+    def put(self, url, info_dict):
+        """
+        Store a private copy of a sanitized info dict (see YoutubeDL.sanitize_info) for url.
+        """
+        key = url.strip()
+        info_dict = copy.deepcopy(info_dict)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), info_dict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, url):
+        with self._lock:
+            self._entries.pop(url.strip(), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by the format fetch thread and the download workers
+info_cache = InfoCache()
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+from utils import app_data_path, sqlite_connect
+from metadata_cache import SLIM_FORMAT_KEYS
+from format_ranking import best_audio
+
+
+UNFINISHED_STATES = ('queued', 'running')
+# Finished and failed jobs are kept this long as history (seconds)
+HISTORY_RETENTION = 30 * 24 * 3600
+
+
+class JobJournal:
+    """
+    SQLite journal of every queued job and its state, so downloads that were
+    queued or running when the app closed can be queued again on the next start.
+    """
+    def __init__(self, db_path=None):
+        """
+        :param db_path: SQLite database file, defaults to the app data folder
+        """
+        self.db_path = db_path or app_data_path("job_journal.sqlite3")
+        with sqlite_connect(self.db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    journal_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    parent_id INTEGER,
+                    source TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    output_dir TEXT NOT NULL,
+                    outtmpl TEXT,
+                    format_spec TEXT,
+                    format_policy TEXT,
+                    selected_format_json TEXT,
+                    state TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_state ON jobs (source, state);
+                CREATE INDEX IF NOT EXISTS jobs_parent ON jobs (parent_id);
+            """)
+
+    def add(self, job, source):
+        """
+        Record a newly queued job and set its journal_id. Jobs that already
+        have one (resumed jobs) are left alone.
+
+        :param source: 'gui' or 'cli', each only resumes its own jobs
+        """
+        if job.journal_id is not None:
+            return
+        now = time.time()
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                cursor = conn.execute(
+                    "INSERT INTO jobs (parent_id, source, url, title, output_dir, format_spec, format_policy, "
+                    "selected_format_json, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job.parent_id, source, job.url, job.title, job.output_dir, job.format_spec, job.format_policy,
+                     _dump_format(job.selected_format), job.state, now, now)
+                )
+                job.journal_id = cursor.lastrowid
+                job.source = source
+        except sqlite3.Error as e:
+            print(f"Job journal write error: {e}", file=sys.stderr)
+
+    def update(self, job, state=None):
+        """
+        Store the current state, title, error and resolved format of a job.
+        """
+        if job.journal_id is None:
+            return
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, title = ?, error = ?, outtmpl = ?, selected_format_json = ?, "
+                    "updated_at = ? WHERE journal_id = ?",
+                    (state or job.state, job.title, job.error, job.outtmpl, _dump_format(job.selected_format),
+                     time.time(), job.journal_id)
+                )
+        except sqlite3.Error as e:
+            print(f"Job journal write error: {e}", file=sys.stderr)
+
+    def unfinished(self, source):
+        """
+        Return the journal rows of jobs from source that never finished, oldest first.
+        """
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE source = ? AND state IN (?, ?) ORDER BY journal_id",
+                    (source,) + UNFINISHED_STATES
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Job journal read error: {e}", file=sys.stderr)
+            return []
+        result = []
+        for row in rows:
+            row = dict(row)
+            row['selected_format'] = json.loads(row.pop('selected_format_json') or 'null')
+            result.append(row)
+        return result
+
+    def entry_urls(self, parent_id):
+        """
+        Return the URLs already queued from the playlist job parent_id.
+        """
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                rows = conn.execute("SELECT url FROM jobs WHERE parent_id = ?", (parent_id,)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Job journal read error: {e}", file=sys.stderr)
+            return set()
+        return {url for (url,) in rows}
+
+    def prune(self, retention=HISTORY_RETENTION):
+        """
+        Forget finished and failed jobs older than retention seconds.
+        """
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                conn.execute(
+                    "DELETE FROM jobs WHERE state NOT IN (?, ?) AND updated_at < ?",
+                    UNFINISHED_STATES + (time.time() - retention,)
+                )
+        except sqlite3.Error as e:
+            print(f"Job journal write error: {e}", file=sys.stderr)
+
+
+def _slim_format(fmt):
+    return {key: fmt[key] for key in SLIM_FORMAT_KEYS + ('media_type',) if fmt.get(key) is not None}
+
+
+def _dump_format(selected_format):
+    # Only what picks and merges the same streams again: URLs, headers and fragment
+    # lists are left out, a resumed job extracts fresh ones anyway
+    if not selected_format:
+        return None
+    slim = _slim_format(selected_format)
+    audio = best_audio(selected_format)
+    if audio is not None:
+        slim['potential_audio'] = [_slim_format(audio)]
+    return json.dumps(slim, default=str)
+
+
+_job_journal = None
+_job_journal_lock = threading.Lock()
+
+
+def get_job_journal():
+    """
+    Return the shared JobJournal, opening the database on first use.
+    """
+    global _job_journal
+    with _job_journal_lock:
+        if _job_journal is None:
+            _job_journal = JobJournal()
+        return _job_journal
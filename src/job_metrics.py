@@ -0,0 +1,275 @@
+# job_metrics.py
+# Where the time of each job goes: per-phase timings, bytes and retries,
+# logged as JSON lines and aggregated per site in the Prometheus text format. Qt-free.
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from utils import app_data_path
+from fragment_tuner import site_key_for_url
+
+
+# queue_wait: queued until a worker picks the job up, and waiting for a postprocessing slot
+# extract: reading the video info from the site (0 when the format fetch had it cached)
+# download: first to last transferred byte
+# postprocess: merging, converting and fixups, inline or in the postprocess pool
+# disk_write: after the last byte until the file is in place (renames and moves)
+PHASES = ('queue_wait', 'extract', 'download', 'postprocess', 'disk_write')
+METRIC_PREFIX = 'avud'
+
+
+class JobMetrics:
+    """
+    Timings and counters of one job, filled in while it runs
+    """
+    def __init__(self):
+        self.queued_at = time.monotonic()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.site = None
+        self.bytes = 0
+        self.retries = 0
+
+    def add(self, phase, seconds):
+        self.phases[phase] += max(0.0, seconds)
+
+    @contextmanager
+    def phase(self, phase):
+        """
+        Time the block as part of phase
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(phase, time.monotonic() - started)
+
+    def average_speed(self):
+        """
+        Bytes per second while transferring, None before anything was transferred
+        """
+        seconds = self.phases['download']
+        return self.bytes / seconds if self.bytes and seconds > 0 else None
+
+
+_SAMPLE_LINE = re.compile(r'^' + METRIC_PREFIX + r'_(\w+)\{(.*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+_UNESCAPES = {'\\\\': '\\', '\\"': '"', '\\n': '\n'}
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _unescape_label(value):
+    return re.sub(r'\\.', lambda match: _UNESCAPES.get(match.group(), match.group()), value)
+
+
+def _format_value(value):
+    return str(value) if isinstance(value, int) else repr(round(value, 6))
+
+
+def _write_atomically(path, text):
+    # Scrapers must never read a half written file; the temp name is per process
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def _file_lock(path):
+    # Lets one process at a time read, add to and rewrite the text file
+    with open(f"{path}.lock", 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        yield
+
+
+# (metric name, help text) of the counters, in the order they are written
+METRIC_FAMILIES = [
+    ('jobs_total', "Jobs done, by site and outcome."),
+    ('job_phase_seconds_total', "Seconds spent in each job phase, by site."),
+    ('downloaded_bytes_total', "Bytes transferred, by site."),
+    ('retries_total', "Download and fragment retries, by site."),
+]
+
+
+def _read_totals(path):
+    # (metric name, ((label, value), ...)) -> value, as written by _render
+    totals = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            match = _SAMPLE_LINE.match(line.rstrip('\n'))
+            if not match:
+                continue
+            labels = tuple((key, _unescape_label(value)) for key, value in _LABEL.findall(match.group(2)))
+            value = float(match.group(3))
+            totals[(match.group(1), labels)] = value if match.group(1) == 'job_phase_seconds_total' else int(value)
+    return totals
+
+
+def _add(totals, increments):
+    for key, value in increments.items():
+        totals[key] = totals.get(key, 0) + value
+
+
+class MetricsRecorder:
+    """
+    Collects finished jobs: one JSON line each, plus per-site totals exported
+    as a Prometheus text file and, optionally, over HTTP. The totals live in
+    the text file and every job is added to what is in it, under a lock file,
+    so they keep growing across runs and processes sharing the file.
+    """
+    def __init__(self, log_path=None, textfile_path=None):
+        """
+        :param log_path: JSON lines file, defaults to the app data folder
+        :param textfile_path: Prometheus text file, defaults to the app data folder
+        """
+        self.log_path = log_path
+        self.textfile_path = textfile_path
+        self._lock = threading.Lock()
+        # Increments of this process not yet in the text file, e.g. after a failed write
+        self._pending = {}
+        self._server = None
+
+    def configure(self, log_path=None, textfile_path=None):
+        """
+        Write to other files than the defaults from now on; None keeps the current setting.
+        """
+        with self._lock:
+            self.log_path = log_path or self.log_path
+            self.textfile_path = textfile_path or self.textfile_path
+
+    def record(self, job, outcome):
+        """
+        Log a job that is done and add it to the totals.
+
+        :param job: DownloadJob with its metrics filled in
+        :param outcome: 'finished', 'failed', 'skipped' or 'expanded'
+        """
+        metrics = job.metrics
+        # Jobs that failed or were skipped before extraction get the same key from their URL
+        site = metrics.site or site_key_for_url(job.url)
+        entry = {
+            'time': round(time.time(), 3),
+            'job': job.job_id,
+            'url': job.url,
+            'title': job.title,
+            'site': site,
+            'outcome': outcome,
+            'phases': {phase: round(seconds, 4) for phase, seconds in metrics.phases.items()},
+            'bytes': metrics.bytes,
+            'retries': metrics.retries,
+            'average_speed': metrics.average_speed(),
+        }
+        if job.error:
+            entry['error'] = job.error
+        increments = {
+            ('jobs_total', (('site', site), ('outcome', outcome))): 1,
+            ('downloaded_bytes_total', (('site', site),)): metrics.bytes,
+            ('retries_total', (('site', site),)): metrics.retries,
+        }
+        for phase, seconds in metrics.phases.items():
+            increments[('job_phase_seconds_total', (('site', site), ('phase', phase)))] = seconds
+        with self._lock:
+            _add(self._pending, increments)
+            try:
+                with open(self.log_path or app_data_path("job_metrics.jsonl"), 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+            except OSError as e:
+                print(f"Job metrics write error: {e}", file=sys.stderr)
+            self._flush()
+
+    def _textfile(self):
+        return self.textfile_path or app_data_path("job_metrics.prom")
+
+    def _load_totals(self, path):
+        # Totals in the text file, empty when there is none yet
+        try:
+            return _read_totals(path)
+        except FileNotFoundError:
+            return {}
+
+    def _flush(self):
+        # Add the pending increments to the text file; they stay pending when that fails
+        path = self._textfile()
+        try:
+            with _file_lock(path):
+                totals = self._load_totals(path)
+                _add(totals, self._pending)
+                _write_atomically(path, self._render(totals))
+        except OSError as e:
+            print(f"Job metrics write error: {e}", file=sys.stderr)
+            return
+        self._pending = {}
+
+    def render_prometheus(self):
+        """
+        Return the per-site totals in the Prometheus text exposition format
+        """
+        with self._lock:
+            try:
+                totals = self._load_totals(self._textfile())
+            except OSError as e:
+                print(f"Job metrics read error: {e}", file=sys.stderr)
+                totals = {}
+            _add(totals, self._pending)
+            return self._render(totals)
+
+    @staticmethod
+    def _render(totals):
+        lines = []
+        for name, help_text in METRIC_FAMILIES:
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+            for (family, labels), value in sorted(totals.items()):
+                if family != name:
+                    continue
+                label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels)
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        Serve the totals at http://host:port/metrics from a daemon thread.
+
+        :return: The port it listens on, useful with port 0
+        """
+        recorder = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = recorder.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+
+# Shared by the download core, the queue and the CLI
+job_metrics = MetricsRecorder()
@@ -1,61 +1,42 @@
 import sys
-import re
 import os
+import threading
+
+from startup_timing import startup_timer
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QMessageBox, 
-     QDialog,QDesktopWidget, QDialog, QVBoxLayout, QLabel, QProgressBar, 
-    QDialogButtonBox
+    QDialog, QDesktopWidget, QVBoxLayout, QLabel, QProgressBar, 
+    QTableWidgetItem, QInputDialog, QLineEdit
 )
-from PyQt5.QtCore import  QPropertyAnimation, QEasingCurve,QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QFont, QIcon
-
+from PyQt5.QtCore import  QPropertyAnimation, QEasingCurve, QTimer
+from PyQt5.QtGui import QFont, QIcon, QColor
 
-import yt_dlp
-from update_checker import check_and_update
+# yt_dlp, update_checker (requests, packaging) and rating_dialog (supabase)
+# are imported lazily after the window is painted, see start_deferred_services
 from progress_tracker import create_progress_tracker
 from mainWindowColorScheme import setup_color_scheme
-from utils import resource_path
+from utils import resource_path, sanitize_filename
+from download_queue import DownloadQueue
+from bandwidth_manager import bandwidth_manager, format_rate, parse_host_limits
+from downloader_core import resume_unfinished_jobs
+from format_prefetcher import FormatPrefetcher
 from mainWindow_init import init_ui  # Import the function
 from format_selection_dialog import FormatSelectionDialog  # Import the function
 
-from rating_dialog import show_rating_dialog_after_delay
 CURRENT_VERSION = "4.1.2"
 
+# Replace with your actual Supabase credentials
+SUPABASE_URL = ""
+SUPABASE_KEY = ""
 
+# Add these constants for update checking
+API_URL = ""  # Replace with your actual API endpoint
 
+startup_timer.mark('imports_done')
 
-class FormatFetchThread(QThread):
-    """
-    Background thread for fetching video formats to prevent UI freezing
-    """
-    formats_fetched = pyqtSignal(list)
-    error_occurred = pyqtSignal(str)
 
-    def __init__(self, url):
-        super().__init__()
-        self.url = url
 
-    def run(self):
-        import yt_dlp
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info_dict = ydl.extract_info(self.url, download=False)
-                
-                # Get all available formats
-                formats = info_dict.get('formats', [])
-                
-                # Filter out duplicates and sort
-                unique_formats = []
-                format_ids = set()
-                for fmt in formats:
-                    if fmt['format_id'] not in format_ids:
-                        unique_formats.append(fmt)
-                        format_ids.add(fmt['format_id'])
-                
-                self.formats_fetched.emit(unique_formats)
-        except Exception as e:
-            self.error_occurred.emit(str(e))
 
 class LoadingDialog(QDialog):
     """
@@ -116,6 +97,59 @@ class StyledVideoDownloader(QMainWindow):
         setup_color_scheme(self)
         init_ui(self,CURRENT_VERSION)
 
+        self.first_paint_done = False
+
+        # Download queue with a bounded pool of workers
+        self.job_rows = {}  # job_id -> (row, progress_hook)
+        self.download_queue = DownloadQueue(self.workers_spinbox.value(), self)
+        self.download_queue.job_added.connect(self.add_job_row)
+        self.download_queue.job_progress.connect(self.update_job_progress)
+        self.download_queue.job_status.connect(self.update_job_status)
+        self.download_queue.job_finished.connect(self.handle_job_finished)
+        self.download_queue.job_failed.connect(self.handle_job_failed)
+        self.download_queue.queue_changed.connect(self.update_queue_status)
+
+        # Formats are fetched in the background as soon as a URL is pasted
+        self.format_prefetcher = FormatPrefetcher(self)
+        self.url_input.textChanged.connect(self.format_prefetcher.url_changed)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            startup_timer.mark('first_paint')
+            # Let the paint finish before doing any slow work
+            QTimer.singleShot(0, self.start_deferred_services)
+
+    def start_deferred_services(self):
+        """
+        Load everything that is not needed for the first window, once it is on screen.
+        """
+        # Warm up yt_dlp in the background so the first format fetch does not pay for the import
+        threading.Thread(target=lambda: __import__('yt_dlp'), daemon=True).start()
+
+        from update_checker import check_and_update
+        from rating_dialog import show_rating_dialog_after_delay
+
+        startup_timer.mark('deferred_imports_done')
+        startup_timer.write_report(CURRENT_VERSION)
+
+        # Check for updates in the background
+        self.update_check_thread = check_and_update(self, CURRENT_VERSION, API_URL)
+        # Pass the required arguments to check_for_update
+        show_rating_dialog_after_delay(SUPABASE_URL, SUPABASE_KEY)
+
+        self.resume_interrupted_downloads()
+
+    def resume_interrupted_downloads(self):
+        """
+        Queue the downloads that were still queued or running when the app last closed.
+        """
+        jobs = resume_unfinished_jobs('gui')
+        if jobs:
+            self.download_queue.resume_jobs(jobs)
+            self.status_label.setText(f"Resumed {len(jobs)} interrupted downloads")
+
     def set_window_size(self):
         """
         Set window size dynamically based on device type.
@@ -180,15 +214,15 @@ class StyledVideoDownloader(QMainWindow):
             QMessageBox.warning(self, "Error", "Please enter a valid URL.")
             return
 
-        # Create and show loading dialog
-        loading_dialog = LoadingDialog(self)
-        loading_dialog.show()
+        # Usually fetched while the URL was pasted, otherwise show the loading dialog
+        loading_dialog = None
+        if not self.format_prefetcher.is_ready(url):
+            loading_dialog = LoadingDialog(self)
+            loading_dialog.show()
 
-        # Create background thread for format fetching
-        self.fetch_thread = FormatFetchThread(url)
-        
         def handle_formats_fetched(formats):
-            loading_dialog.close()
+            if loading_dialog is not None:
+                loading_dialog.close()
             # Store available formats
             self.available_formats = formats
             
@@ -212,21 +246,11 @@ class StyledVideoDownloader(QMainWindow):
             loading_dialog.close()
             QMessageBox.warning(self, "Error", f"Could not retrieve formats: {error}")
 
-        # Connect thread signals
-        self.fetch_thread.formats_fetched.connect(handle_formats_fetched)
-        self.fetch_thread.error_occurred.connect(handle_fetch_error)
-        
-        # Start the thread
-        self.fetch_thread.start()
+        # Joins the prefetch of this URL if it is still running
+        self.format_prefetcher.request(url, handle_formats_fetched, handle_fetch_error)
 
     def sanitize_filename(self, filename):
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = re.sub(r'[^\x00-\x7F]+', '', filename)
-        max_length = 100
-        if len(filename) > max_length:
-            filename = filename[:max_length]
-        filename = filename.strip('. ')
-        return filename or 'video'
+        return sanitize_filename(filename)
 
     def ensure_directory_exists(self, path):
         """
@@ -251,76 +275,113 @@ class StyledVideoDownloader(QMainWindow):
             QMessageBox.warning(self, "Error", "Please select an output directory.")
             return
 
-        if not self.selected_format:
+        # A hand-picked format wins, otherwise the automatic policy picks one
+        format_policy = self.policy_combo.currentData()
+        if not self.selected_format and not format_policy:
             QMessageBox.warning(self, "Error", "Please select a format to download.")
             return
 
-        # Create progress tracker hook
-        progress_hook = create_progress_tracker(self.progress_bar, self.status_label)
-         # Disable the button and change its color
-        self.download_button.setEnabled(False)
-        self.download_button.setStyleSheet("background-color: #FF6347; color: white;")  # Tomato color
-        self.status_label.setText("Starting download...")
-
-        # Prepare yt-dlp options with selected format
-        ydl_opts = {
-            'format': self.selected_format['format_id'],
-            'outtmpl': f"{self.output_dir}/%(title).100s.%(ext)s",
-            'progress_hooks': [progress_hook],
-            # Key addition: Merge audio if no audio stream exists
-            'postprocessors': [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',  # or another preferred format
-            }] if 'potential_audio' in self.selected_format else []
-        }
-        if 'potential_audio' in self.selected_format:
-            # Select the best audio format
-            best_audio = max(
-                self.selected_format['potential_audio'], 
-                key=lambda x: x.get('abr', 0)  # Choose by audio bitrate
-            )
-            ydl_opts['format'] = f"{self.selected_format['format_id']}+{best_audio['format_id']}"
+        # Queue the job, it starts as soon as a worker is free
+        self.download_queue.add_job(url, self.selected_format, self.output_dir, format_policy)
+
+        # Clear the input so the next URL can be pasted right away
+        self.url_input.clear()
+        self.selected_format = None
+        self.selected_format_label.setText("No format selected")
 
+    def set_max_workers(self, max_workers):
+        """
+        Change how many downloads run at the same time.
+        """
+        if hasattr(self, 'download_queue'):
+            self.download_queue.set_max_workers(max_workers)
 
+    def set_rate_limit(self, kib_per_second):
+        """
+        Change the speed limit shared by all downloads, 0 for unlimited.
+        """
+        bandwidth_manager.set_global_limit(kib_per_second * 1024 or None)
 
+    def edit_host_limits(self):
+        """
+        Let the user edit the per-site speed limits as HOST=RATE pairs, applied to running downloads too.
+        """
+        current = ", ".join(
+            f"{host}={format_rate(rate)}" for host, rate in sorted(bandwidth_manager.host_limits.items())
+        )
+        text, ok = QInputDialog.getText(
+            self, "Per site limits", "Speed limit per site, e.g. example.com=500K, video.org=2M:",
+            QLineEdit.Normal, current
+        )
+        if not ok:
+            return
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                try:
-                    video_info = ydl.extract_info(url, download=False)
-                    if video_info:
-                        video_title = self.sanitize_filename(video_info.get('title', 'Unknown Title'))
-                        self.status_label.setText(f"Downloading: {video_title}")
-                        QApplication.processEvents()
-
-                        # Start downloading
-                        ydl.download([url])
-                    else:
-                        raise Exception("Video information could not be retrieved.")
-                except yt_dlp.utils.DownloadError as e:
-                    if "private video" in str(e).lower() or "not available" in str(e).lower():
-                        QMessageBox.warning(self, "Error", "The video is private or not available for download.")
-                    else:
-                        QMessageBox.warning(self, "Error", f"Download failed: {str(e)}")
-                    self.status_label.setText("Download failed")
-        except Exception as e:
-            error_message = re.sub(r'\x1b\[[0-9;]*m', '', str(e))  # Strip ANSI color codes
-            QMessageBox.warning(self, "Error", f"An unexpected error occurred: {error_message}")
-            self.status_label.setText("Error occurred")
-        finally:
-            # Re-enable the button and reset its color
-            self.download_button.setEnabled(True)
-            self.download_button.setStyleSheet("")  # Reset to default
-            self.status_label.setText("Download complete or failed.")
+            host_limits = parse_host_limits(value.strip() for value in text.split(',') if value.strip())
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        for host in set(bandwidth_manager.host_limits) - set(host_limits):
+            bandwidth_manager.set_host_limit(host, None)
+        for host, rate in host_limits.items():
+            bandwidth_manager.set_host_limit(host, rate)
+
+    def add_job_row(self, job):
+        """
+        Add a queue table row with its own progress bar for a new job.
+        """
+        row = self.queue_table.rowCount()
+        self.queue_table.insertRow(row)
+
+        title_item = QTableWidgetItem(job.title)
+        title_item.setToolTip(job.url)
+        status_item = QTableWidgetItem("Queued")
+        progress_bar = QProgressBar()
+        progress_bar.setTextVisible(True)
+
+        self.queue_table.setItem(row, 0, title_item)
+        self.queue_table.setCellWidget(row, 1, progress_bar)
+        self.queue_table.setItem(row, 2, status_item)
+
+        # Each job gets its own tracker writing into its own row
+        self.job_rows[job.job_id] = (row, create_progress_tracker(progress_bar, status_item))
+
+    def update_job_progress(self, job, d):
+        row, progress_hook = self.job_rows[job.job_id]
+        progress_hook(d)
+
+    def update_job_status(self, job, text):
+        row, _ = self.job_rows[job.job_id]
+        self.queue_table.item(row, 2).setText(text)
+
+    def handle_job_finished(self, job):
+        row, _ = self.job_rows[job.job_id]
+        self.queue_table.item(row, 0).setText(job.title)
+        self.queue_table.cellWidget(row, 1).setValue(100)
+        if job.playlist_size is not None:
+            self.queue_table.item(row, 2).setText(f"Playlist: queued {job.playlist_size} videos")
+        elif job.skipped:
+            self.queue_table.item(row, 2).setText("Already downloaded, skipped")
+        else:
+            self.queue_table.item(row, 2).setText("Download complete!")
+
+    def handle_job_failed(self, job, error):
+        row, _ = self.job_rows[job.job_id]
+        status_item = self.queue_table.item(row, 2)
+        status_item.setText("Download failed")
+        status_item.setToolTip(error)
+        status_item.setBackground(QColor(200, 100, 100, 100))  # Light red
+
+    def update_queue_status(self, active, pending):
+        if active or pending:
+            self.status_label.setText(f"Downloading: {active} active | {pending} queued")
+        else:
+            self.status_label.setText("All downloads complete or failed.")
 
     
     
 if __name__ == "__main__":
-    # Replace with your actual Supabase credentials
-    SUPABASE_URL = ""
-    SUPABASE_KEY = ""
-    # Print details for verification
-            
     app = QApplication(sys.argv)
+    startup_timer.mark('qapplication_created')
     
     # Optional: Set application-wide font
     font = QFont("Arial", 10)
@@ -330,14 +391,8 @@ if __name__ == "__main__":
     app.setWindowIcon(QIcon(icon_path))
     
     window = StyledVideoDownloader()
+    startup_timer.mark('window_created')
     window.show()
-    
-    # Add these constants for update checking
-    API_URL = ""  # Replace with your actual API endpoint
-    
-    # Check for updates
-    check_and_update(window, CURRENT_VERSION, API_URL)
-    # Pass the required arguments to check_for_update
-    show_rating_dialog_after_delay(SUPABASE_URL, SUPABASE_KEY)
 
-    sys.exit(app.exec_())
\ No newline at end of file
+    # Update check and rating prompt start from window.start_deferred_services after the first paint
+    sys.exit(app.exec_())
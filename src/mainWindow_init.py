@@ -1,10 +1,13 @@
 from PyQt5.QtWidgets import (
-    QLabel, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout, QWidget, QProgressBar
+    QLabel, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout, QWidget,
+    QSpinBox, QComboBox, QTableWidget, QHeaderView, QAbstractItemView
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QPixmap
 
 from utils import resource_path
+from download_queue import DEFAULT_MAX_WORKERS
+from format_ranking import POLICY_CHOICES
 
 
 def init_ui(self,CURRENT_VERSION):
@@ -44,9 +47,17 @@ def init_ui(self,CURRENT_VERSION):
     self.selected_format_label = QLabel("No format selected")
     self.select_format_button = QPushButton("Select Format")
     self.select_format_button.clicked.connect(self.show_format_selection)
+
+    # Automatic format choice, used when no format was selected by hand
+    self.policy_combo = QComboBox()
+    self.policy_combo.addItem("Manual selection", None)
+    for label, policy in POLICY_CHOICES:
+        self.policy_combo.addItem(f"Auto: {label}", policy)
+
     format_layout.addWidget(format_label)
     format_layout.addWidget(self.selected_format_label)
     format_layout.addWidget(self.select_format_button)
+    format_layout.addWidget(self.policy_combo)
 
     # Output Directory Section
     output_layout = QHBoxLayout()
@@ -56,15 +67,42 @@ def init_ui(self,CURRENT_VERSION):
     output_layout.addWidget(self.output_label)
     output_layout.addWidget(self.output_button)
 
-    # Download Button
+    # Download Button and concurrency setting
+    download_layout = QHBoxLayout()
     self.download_button = QPushButton("Download")
     self.download_button.clicked.connect(self.download_video)
+    workers_label = QLabel("Parallel:")
+    self.workers_spinbox = QSpinBox()
+    self.workers_spinbox.setRange(1, 16)
+    self.workers_spinbox.setValue(DEFAULT_MAX_WORKERS)
+    self.workers_spinbox.valueChanged.connect(self.set_max_workers)
+    # Shared speed limit for all downloads, changeable while they run
+    limit_label = QLabel("Limit:")
+    self.rate_limit_spinbox = QSpinBox()
+    self.rate_limit_spinbox.setRange(0, 1000000)
+    self.rate_limit_spinbox.setSingleStep(256)
+    self.rate_limit_spinbox.setSuffix(" KiB/s")
+    self.rate_limit_spinbox.setSpecialValueText("Unlimited")
+    self.rate_limit_spinbox.valueChanged.connect(self.set_rate_limit)
+    # Caps for single sites, within the shared limit
+    self.host_limits_button = QPushButton("Per site...")
+    self.host_limits_button.clicked.connect(self.edit_host_limits)
+    download_layout.addWidget(self.download_button, 1)
+    download_layout.addWidget(workers_label)
+    download_layout.addWidget(self.workers_spinbox)
+    download_layout.addWidget(limit_label)
+    download_layout.addWidget(self.rate_limit_spinbox)
+    download_layout.addWidget(self.host_limits_button)
+
+    # Queue Section: one row with its own progress bar per job
+    self.queue_table = QTableWidget()
+    self.queue_table.setColumnCount(3)
+    self.queue_table.setHorizontalHeaderLabels(["Video", "Progress", "Status"])
+    self.queue_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    self.queue_table.setSelectionMode(QAbstractItemView.NoSelection)
+    self.queue_table.verticalHeader().setVisible(False)
+    self.queue_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
-    # Progress Section
-    self.progress_bar = QProgressBar()
-    self.progress_bar.setTextVisible(True)
-    self.progress_bar.setFormat("%p% | %v/%m")
-    
     self.status_label = QLabel("Ready to download")
     self.status_label.setAlignment(Qt.AlignCenter)
 
@@ -85,9 +123,9 @@ def init_ui(self,CURRENT_VERSION):
     main_layout.addSpacing(10)
     main_layout.addLayout(output_layout)
     main_layout.addSpacing(10)
-    main_layout.addWidget(self.download_button)
+    main_layout.addLayout(download_layout)
     main_layout.addSpacing(10)
-    main_layout.addWidget(self.progress_bar)
+    main_layout.addWidget(self.queue_table)
     main_layout.addWidget(self.status_label)
     main_layout.addWidget(self.version_label)
 
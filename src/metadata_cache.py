@@ -0,0 +1,183 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from utils import app_data_path, sqlite_connect
+
+
+# Fields of each format that the format dialog needs. Format URLs, headers
+# and fragment lists are left out: they expire long before the rest does.
+SLIM_FORMAT_KEYS = (
+    'format_id', 'format_note', 'ext', 'protocol', 'width', 'height',
+    'resolution', 'fps', 'vcodec', 'acodec', 'abr', 'vbr', 'tbr', 'asr',
+    'filesize', 'filesize_approx', 'dynamic_range', 'language',
+)
+SLIM_INFO_KEYS = (
+    'id', 'title', 'extractor', 'extractor_key', 'webpage_url',
+    'duration', 'uploader', 'thumbnail',
+)
+
+# How long a cached format list is trusted, per extractor (seconds)
+SITE_EXPIRY = {
+    'youtube': 3 * 24 * 3600,
+    'vimeo': 3 * 24 * 3600,
+    'twitter': 24 * 3600,
+    'instagram': 12 * 3600,
+    'tiktok': 12 * 3600,
+    'generic': 6 * 3600,
+}
+DEFAULT_EXPIRY = 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+# Query parameters that never change which video a URL points to
+TRACKING_PARAMS = {'feature', 'si', 'pp', 'fbclid', 'gclid', 'igshid', 'ref', 'ref_src'}
+
+
+def normalize_url(url):
+    """
+    Normalize a video URL so trivially different links share a cache entry.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower() or 'https', host, path, urlencode(query), ''))
+
+
+def slim_info(info_dict):
+    """
+    Keep only the stable parts of an extract_info result.
+    """
+    slim = {key: info_dict[key] for key in SLIM_INFO_KEYS if info_dict.get(key) is not None}
+    slim['formats'] = [
+        {key: fmt[key] for key in SLIM_FORMAT_KEYS if fmt.get(key) is not None}
+        for fmt in info_dict.get('formats') or []
+    ]
+    return slim
+
+
+def site_expiry(extractor_key):
+    """
+    Return how long format lists from this extractor stay valid in the cache.
+    """
+    return SITE_EXPIRY.get((extractor_key or 'generic').lower(), DEFAULT_EXPIRY)
+
+
+class MetadataCache:
+    """
+    SQLite-backed cache of slimmed extraction results, keyed by the extractor
+    video id and reachable from every normalized URL that resolved to it.
+    """
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param db_path: SQLite database file, defaults to the app data folder
+        :param max_entries: Number of videos kept before the least recently used are dropped
+        """
+        self.db_path = db_path or app_data_path("metadata_cache.sqlite3")
+        self.max_entries = max_entries
+        with sqlite_connect(self.db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS metadata (
+                    cache_key TEXT PRIMARY KEY,
+                    extractor TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    info_json TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS metadata_last_used ON metadata (last_used);
+                CREATE TABLE IF NOT EXISTS url_index (
+                    url TEXT PRIMARY KEY,
+                    cache_key TEXT NOT NULL
+                );
+            """)
+
+    def get(self, url):
+        """
+        Return the cached slim info for url, or None when missing or expired.
+        """
+        now = time.time()
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                row = conn.execute(
+                    "SELECT m.cache_key, m.info_json, m.expires_at FROM url_index u "
+                    "JOIN metadata m ON m.cache_key = u.cache_key WHERE u.url = ?",
+                    (normalize_url(url),)
+                ).fetchone()
+                if row is None:
+                    return None
+                cache_key, info_json, expires_at = row
+                if expires_at < now:
+                    conn.execute("DELETE FROM metadata WHERE cache_key = ?", (cache_key,))
+                    conn.execute("DELETE FROM url_index WHERE cache_key = ?", (cache_key,))
+                    return None
+                conn.execute("UPDATE metadata SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+            return json.loads(info_json)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Metadata cache read error: {e}", file=sys.stderr)
+            return None
+
+    def put(self, url, info_dict):
+        """
+        Store the slimmed form of a sanitized extract_info result for url.
+        """
+        extractor = info_dict.get('extractor_key') or info_dict.get('extractor') or 'generic'
+        video_id = info_dict.get('id')
+        if not video_id:
+            return
+        cache_key = f"{extractor.lower()}:{video_id}"
+        now = time.time()
+        try:
+            with sqlite_connect(self.db_path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (cache_key, extractor, video_id, json.dumps(slim_info(info_dict)),
+                     now, now + site_expiry(extractor), now)
+                )
+                urls = {normalize_url(url)}
+                if info_dict.get('webpage_url'):
+                    urls.add(normalize_url(info_dict['webpage_url']))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO url_index VALUES (?, ?)",
+                    [(u, cache_key) for u in urls]
+                )
+                self._enforce_size_cap(conn)
+        except sqlite3.Error as e:
+            print(f"Metadata cache write error: {e}", file=sys.stderr)
+
+    def _enforce_size_cap(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        conn.execute(
+            "DELETE FROM metadata WHERE cache_key IN "
+            "(SELECT cache_key FROM metadata ORDER BY last_used LIMIT ?)",
+            (count - self.max_entries,)
+        )
+        conn.execute("DELETE FROM url_index WHERE cache_key NOT IN (SELECT cache_key FROM metadata)")
+
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """
+    Return the shared MetadataCache, opening the database on first use.
+    """
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            _metadata_cache = MetadataCache()
+        return _metadata_cache
@@ -0,0 +1,145 @@
+# postprocess_pool.py
+# Second pipeline stage: merging and converting downloaded streams with ffmpeg,
+# outside the download workers so they can move on to the next URL. Qt-free.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from remux import container_plan
+
+
+# ffmpeg saturates a core per job, more at once only makes every merge slower
+DEFAULT_POSTPROCESS_WORKERS = os.cpu_count() or 2
+
+
+def ffmpeg_available():
+    """
+    Whether yt-dlp can find ffmpeg to merge streams
+    """
+    from yt_dlp.postprocessor import FFmpegMergerPP
+    return FFmpegMergerPP(None).available
+
+
+def merged_extension(video_format, audio_format, merge_output_format=None):
+    """
+    Extension of the merged file, chosen the way yt-dlp chooses it when merging inline
+    """
+    if merge_output_format:
+        return merge_output_format
+    from yt_dlp.utils import get_compatible_ext
+    return get_compatible_ext(
+        vcodecs=[video_format.get('vcodec')], acodecs=[audio_format.get('acodec')],
+        vexts=[video_format.get('ext')], aexts=[audio_format.get('ext')]
+    )
+
+
+def merged_path(video_part, video_format_id, ext):
+    """
+    Path of the merged file next to a video part named '<name>.f<format_id>.<ext>'
+    """
+    stem = os.path.splitext(video_part)[0]
+    suffix = f".f{video_format_id}"
+    if stem.endswith(suffix):
+        stem = stem[:-len(suffix)]
+    return f"{stem}.{ext}"
+
+
+_container_pp_class = None
+
+
+def container_postprocessor(ydl, container):
+    """
+    Return a yt-dlp postprocessor that gets the finished file into container,
+    deciding with remux.container_plan from the codecs the file really has.
+    """
+    global _container_pp_class
+    if _container_pp_class is None:
+        from yt_dlp.postprocessor import PostProcessor, FFmpegVideoConvertorPP, get_postprocessor
+
+        class PartialConvertorPP(FFmpegVideoConvertorPP):
+            # Adds output arguments such as '-c:v copy' to keep the streams that fit
+            def __init__(self, downloader, preferedformat, output_args):
+                super().__init__(downloader, preferedformat)
+                self.output_args = output_args
+
+            def _options(self, target_ext):
+                yield from super()._options(target_ext)
+                yield from self.output_args
+
+        class ContainerPP(PostProcessor):
+            def __init__(self, downloader, container):
+                super().__init__(downloader)
+                self.container = container
+
+            def run(self, info):
+                plan = container_plan(info, self.container)
+                if plan is None:
+                    return [], info
+                key, output_args = plan
+                if output_args:
+                    pp = PartialConvertorPP(self._downloader, self.container, output_args)
+                else:
+                    pp = get_postprocessor(key)(self._downloader, preferedformat=self.container)
+                return pp.run(info)
+
+        _container_pp_class = ContainerPP
+    return _container_pp_class(ydl, container)
+
+
+def merge_parts(parts, output_path, container=None, quiet=False):
+    """
+    Merge separately downloaded streams into output_path with a stream copy,
+    get the result into the required container and delete the parts.
+
+    :param parts: (file path, format dict) for the video and the audio stream, in that order
+    :param output_path: Merged file to write
+    :param container: Container the file must end up in, None when any will do
+    :param quiet: Silence yt-dlp console output
+    :return: Path of the final file
+    """
+    import yt_dlp
+    from yt_dlp.postprocessor import FFmpegMergerPP
+
+    requested_formats = [dict(fmt, filepath=path, protocol=fmt.get('protocol') or '') for path, fmt in parts]
+    info = {
+        'filepath': output_path,
+        'ext': os.path.splitext(output_path)[1][1:],
+        'requested_formats': requested_formats,
+        '__files_to_merge': [path for path, _ in parts],
+    }
+    with yt_dlp.YoutubeDL({'quiet': quiet, 'no_warnings': quiet}) as ydl:
+        info = ydl.run_pp(FFmpegMergerPP(ydl), info)
+        if container:
+            info = ydl.run_pp(container_postprocessor(ydl, container), info)
+    return info['filepath']
+
+
+class PostprocessPool:
+    """
+    Bounded pool for postprocessing work. The work itself runs in ffmpeg
+    processes; pool threads only start them and wait, so they don't hold the GIL.
+    """
+    def __init__(self, max_workers=DEFAULT_POSTPROCESS_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='postprocess')
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn and return its concurrent.futures.Future.
+        """
+        return self._executor.submit(fn, *args, **kwargs)
+
+
+_postprocess_pool = None
+_postprocess_pool_lock = threading.Lock()
+
+
+def get_postprocess_pool():
+    """
+    Return the shared PostprocessPool, creating it on first use
+    """
+    global _postprocess_pool
+    with _postprocess_pool_lock:
+        if _postprocess_pool is None:
+            _postprocess_pool = PostprocessPool()
+        return _postprocess_pool
@@ -0,0 +1,153 @@
+import math
+import threading
+import time
+
+
+DEFAULT_MAX_RATE = 10.0  # UI updates per second
+DEFAULT_SPEED_HALF_LIFE = 2.0  # seconds
+
+
+class ProgressAggregator:
+    """
+    Merge raw yt-dlp progress hook calls into at most max_rate snapshots per
+    second, with an EWMA speed and ETA computed from downloaded_bytes.
+    """
+    def __init__(self, max_rate=DEFAULT_MAX_RATE, half_life=DEFAULT_SPEED_HALF_LIFE, clock=time.monotonic):
+        """
+        :param max_rate: Maximum number of 'downloading' snapshots per second
+        :param half_life: Seconds after which an old speed sample weighs half as much
+        :param clock: Monotonic time source, replaceable for benchmarks
+        """
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.half_life = half_life
+        self.clock = clock
+        self._reset(None)
+        self.last_emit = None
+
+    def _reset(self, filename):
+        # yt-dlp restarts downloaded_bytes at 0 for every file (video, then audio)
+        self.filename = filename
+        self.speed = None
+        self.sample_time = None
+        self.sample_bytes = 0
+
+    def update(self, d):
+        """
+        Feed one progress hook dict.
+
+        :param d: Dictionary passed by yt-dlp to progress hooks
+        :return: A snapshot dict when the UI should be updated, otherwise None
+        """
+        status = d.get('status')
+        now = self.clock()
+        if d.get('filename') != self.filename:
+            self._reset(d.get('filename'))
+
+        if status != 'downloading':
+            # State changes are rare and always reported right away
+            self.last_emit = now
+            return self._snapshot(d, status)
+
+        downloaded = d.get('downloaded_bytes') or 0
+        if self.sample_time is None:
+            self.sample_time = now
+            self.sample_bytes = downloaded
+        else:
+            elapsed = now - self.sample_time
+            if elapsed >= self.min_interval and elapsed > 0:
+                rate = max(0, downloaded - self.sample_bytes) / elapsed
+                if self.speed is None:
+                    self.speed = rate
+                else:
+                    weight = 1 - math.pow(0.5, elapsed / self.half_life)
+                    self.speed += weight * (rate - self.speed)
+                self.sample_time = now
+                self.sample_bytes = downloaded
+
+        if self.last_emit is not None and now - self.last_emit < self.min_interval:
+            return None
+        self.last_emit = now
+        return self._snapshot(d, status)
+
+    def _snapshot(self, d, status):
+        downloaded = d.get('downloaded_bytes') or 0
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        fragment_index = d.get('fragment_index')
+        fragment_count = d.get('fragment_count')
+
+        percent = None
+        remaining = None
+        if total:
+            percent = min(100.0, downloaded * 100.0 / total)
+            remaining = max(0, total - downloaded)
+        elif fragment_index and fragment_count:
+            # HLS/DASH without sizes: count fragments, guess bytes from the average so far
+            percent = min(100.0, fragment_index * 100.0 / fragment_count)
+            remaining = downloaded / fragment_index * max(0, fragment_count - fragment_index)
+
+        eta = None
+        if remaining is not None and self.speed:
+            eta = remaining / self.speed
+
+        return {
+            'status': status,
+            'downloaded_bytes': downloaded,
+            'total_bytes': total,
+            'fragment_index': fragment_index,
+            'fragment_count': fragment_count,
+            'percent': percent,
+            'speed': self.speed,
+            'eta': eta,
+            'error': d.get('error'),
+        }
+
+
+def format_bytes(num_bytes):
+    """
+    Format a byte count as a short human readable string, e.g. 3.4MiB
+    """
+    if num_bytes is None:
+        return 'N/A'
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f}TiB"
+
+
+def format_eta(seconds):
+    """
+    Format seconds as MM:SS or HH:MM:SS
+    """
+    if seconds is None:
+        return 'N/A'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class BandwidthMeter:
+    """
+    Thread-safe EWMA of the average speed of finished downloads, in bytes/s
+    """
+    def __init__(self, weight=0.3):
+        self.weight = weight
+        self.speed = None
+        self._lock = threading.Lock()
+
+    def record(self, num_bytes, seconds):
+        if num_bytes <= 0 or seconds <= 0:
+            return
+        rate = num_bytes / seconds
+        with self._lock:
+            self.speed = rate if self.speed is None else self.speed + self.weight * (rate - self.speed)
+
+    def estimate(self):
+        with self._lock:
+            return self.speed
+
+
+# Measured by the download core, used for time-budget format policies
+bandwidth_meter = BandwidthMeter()
@@ -1,4 +1,5 @@
-from PyQt5.QtWidgets import QMessageBox, QApplication
+from progress_aggregator import format_bytes, format_eta
+
 
 class ProgressTracker:
     def __init__(self, progress_bar, status_label):
@@ -14,48 +15,41 @@ class ProgressTracker:
     def progress_hook(self, d):
         """
         Track download progress and update UI.
+        Connected to DownloadWorker.progress_updated, so it always runs on the GUI thread.
         
-        :param d: Dictionary containing download status information
+        :param d: Progress snapshot from ProgressAggregator
         """
         try:
             status = d.get('status')
 
             if status == 'downloading':
-                # Extract download progress information
-                downloaded_bytes = d.get('downloaded_bytes', 0)
-                total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-                
-                # Calculate progress percentage
-                if total_bytes > 0:
-                    percent = min(100, (downloaded_bytes / total_bytes) * 100)
-                else:
-                    percent = 0
+                # Snapshot already carries percent, smoothed speed and ETA
+                percent = d.get('percent')
+                speed = f"{format_bytes(d['speed'])}/s" if d.get('speed') else 'N/A'
+                eta = format_eta(d.get('eta'))
 
-                # Get download speed
-                speed = d.get('_speed_str', 'N/A').strip()
-                
-                # Get estimated time remaining
-                eta = d.get('_eta_str', 'N/A').strip()
-
-                # Update progress bar
-                self.progress_bar.setValue(int(percent))
+                if percent is None:
+                    # Unknown size: show a busy bar and the downloaded amount
+                    self.progress_bar.setRange(0, 0)
+                    status_text = f"Downloading: {format_bytes(d.get('downloaded_bytes'))} | Speed: {speed}"
+                else:
+                    self.progress_bar.setRange(0, 100)
+                    self.progress_bar.setValue(int(percent))
+                    status_text = f"Downloading: {percent:.1f}% | Speed: {speed} | ETA: {eta}"
 
                 # Update status label with detailed information
-                status_text = f"Downloading: {percent:.1f}% | Speed: {speed} | ETA: {eta}"
                 self.status_label.setText(status_text)
-                QApplication.processEvents()
 
             elif status == 'finished':
-                # Download complete
+                # Stream finished, merging or conversion may still follow
+                self.progress_bar.setRange(0, 100)
                 self.progress_bar.setValue(100)
-                self.status_label.setText("Download complete!")
-                QMessageBox.information(None, "Success", "Download completed successfully!")
+                self.status_label.setText("Download finished, processing file...")
 
             elif status == 'error':
                 # Handle download errors
                 error_msg = d.get('error', 'Unknown error')
                 self.status_label.setText(f"Download error: {error_msg}")
-                QMessageBox.warning(None, "Download Error", str(error_msg))
                 self.progress_bar.setValue(0)
         
         except Exception as e:
@@ -69,7 +63,7 @@ def create_progress_tracker(progress_bar, status_label):
     
     :param progress_bar: QProgressBar to show download progress
     :param status_label: QLabel to show download status
-    :return: A progress_hook function
+    :return: A progress_hook function, to connect to DownloadWorker.progress_updated
     """
     tracker = ProgressTracker(progress_bar, status_label)
     return tracker.progress_hook
\ No newline at end of file
@@ -5,12 +5,57 @@ from PyQt5.QtWidgets import (
     QDialogButtonBox, QFrame, QApplication
 )
 from PyQt5.QtGui import QFont, QIcon, QPixmap, QColor, QPainter
-from PyQt5.QtCore import QPointF,QTimer,Qt
-from supabase import create_client, Client
-import requests
+from PyQt5.QtCore import QPointF,QTimer,Qt,QThread,pyqtSignal
+# supabase and requests are imported where they are used, they are slow to load
 import platform
 import uuid
 import socket
+import json
+import time
+import threading
+
+from utils import app_data_path
+
+
+# Supabase clients are expensive to build, one per (url, key) is shared
+_supabase_clients = {}
+_supabase_lock = threading.Lock()
+
+
+def get_supabase_client(supabase_url, supabase_key):
+    """
+    Return the shared Supabase client for these credentials, creating it on first use.
+    """
+    with _supabase_lock:
+        client = _supabase_clients.get((supabase_url, supabase_key))
+        if client is None:
+            from supabase import create_client
+
+            client = create_client(supabase_url, supabase_key)
+            _supabase_clients[(supabase_url, supabase_key)] = client
+        return client
+
+
+def load_rating_state():
+    """
+    Load the local rating state, e.g. {'rated': True, 'rated_at': ...}
+    """
+    try:
+        with open(app_data_path("rating_state.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_rating_state(rated=True):
+    """
+    Remember locally that the user has rated, so they are never asked again.
+    """
+    try:
+        with open(app_data_path("rating_state.json"), 'w', encoding='utf-8') as f:
+            json.dump({'rated': rated, 'rated_at': time.time()}, f)
+    except OSError as e:
+        print(f"Could not save rating state: {e}")
 
 class StarRatingWidget(QFrame):
     def __init__(self, parent=None):
@@ -192,8 +237,8 @@ class RatingDialog(QDialog):
     def send_rating(self):
         """Send rating and optional review to Supabase."""
         try:
-            # Initialize Supabase client
-            supabase = create_client(self.supabase_url, self.supabase_key)
+            # Reuse the Supabase client
+            supabase = get_supabase_client(self.supabase_url, self.supabase_key)
 
             # Collect system info
             system_info = self.get_system_info()
@@ -211,6 +256,7 @@ class RatingDialog(QDialog):
 
             # Insert rating into Supabase
             response = supabase.table('ratings').insert(rating_data).execute()
+            save_rating_state(True)
 
             # Close dialog
             self.accept()
@@ -220,23 +266,55 @@ class RatingDialog(QDialog):
             self.reject()
 
 
+class RatingCheckThread(QThread):
+    """
+    Background thread for the previous-rating lookup, so the network round trip never blocks the UI
+    """
+    rating_checked = pyqtSignal(bool)
+
+    def __init__(self, supabase_url, supabase_key):
+        super().__init__()
+        self.supabase_url = supabase_url
+        self.supabase_key = supabase_key
+
+    def run(self):
+        self.rating_checked.emit(check_previous_rating(self.supabase_url, self.supabase_key))
+
+
+# Keeps the running check thread alive until it is done
+_rating_check_thread = None
+
+
 def show_rating_dialog_after_delay(supabase_url, supabase_key, delay_ms=10000):
     """
     Show rating dialog after a specified delay.
+    The previous-rating lookup runs in the background, and is skipped entirely
+    once the local state file records that a rating was given.
     
     :param supabase_url: Supabase project URL
     :param supabase_key: Supabase API key
     :param delay_ms: Delay in milliseconds before showing dialog (default 10 seconds)
     """
-    def show_dialog():
-        if not check_previous_rating(supabase_url, supabase_key):
+    if load_rating_state().get('rated'):
+        return
+
+    def handle_rating_checked(already_rated):
+        if not already_rated:
             dialog = RatingDialog(supabase_url, supabase_key)
             dialog.exec_()
         else:
+            # Remember it, so the server is not asked again on the next launch
+            save_rating_state(True)
             print("User has already provided a rating. Dialog will not be shown.")
+
+    def start_check():
+        global _rating_check_thread
+        _rating_check_thread = RatingCheckThread(supabase_url, supabase_key)
+        _rating_check_thread.rating_checked.connect(handle_rating_checked)
+        _rating_check_thread.start()
     
-    # Create a single shot timer to show dialog after delay
-    QTimer.singleShot(delay_ms, show_dialog)
+    # Create a single shot timer to start the check after delay
+    QTimer.singleShot(delay_ms, start_check)
     
     
 def check_previous_rating(supabase_url, supabase_key):
@@ -247,12 +325,14 @@ def check_previous_rating(supabase_url, supabase_key):
     :param supabase_key: Supabase API key
     :return: Boolean indicating if a rating has been given
     """
+    import requests
+
     try:
         # Retrieve the user's IP address
         ip_address = socket.gethostbyname(socket.gethostname())
 
-        # Initialize Supabase client
-        supabase = create_client(supabase_url, supabase_key)
+        # Reuse the Supabase client
+        supabase = get_supabase_client(supabase_url, supabase_key)
 
         # Query the Supabase table for the given IP address
         response = supabase.table('ratings').select('*').eq('ip_address', ip_address).execute()
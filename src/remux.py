@@ -0,0 +1,129 @@
+# remux.py
+# Decide how the downloaded streams end up in a container: stream copy
+# whenever the codecs fit, transcoding only the streams that don't fit when a
+# container is required. Qt-free.
+
+
+# Codec families each container can hold without re-encoding (ffmpeg muxers).
+# MP4 takes VP9, AV1 and Opus as well, all registered for ISO BMFF.
+CONTAINER_CODECS = {
+    'mp4': (
+        {'avc1', 'hevc', 'av01', 'vp09', 'mp4v'},
+        {'mp4a', 'opus', 'mp3', 'ac-3', 'ec-3', 'flac', 'alac'},
+    ),
+    'webm': (
+        {'vp8', 'vp09', 'av01'},
+        {'opus', 'vorbis'},
+    ),
+    'mov': (
+        {'avc1', 'hevc', 'mp4v', 'prores'},
+        {'mp4a', 'mp3', 'ac-3', 'alac'},
+    ),
+    # Matroska holds anything yt-dlp downloads
+    'mkv': (None, None),
+}
+# Tried in this order when the preferred container does not fit
+FALLBACK_CONTAINERS = ('mp4', 'webm', 'mkv')
+DEFAULT_CONTAINER = 'mp4'
+
+# Codec strings as yt-dlp reports them -> codec family
+_CODEC_ALIASES = {
+    'avc1': 'avc1', 'avc3': 'avc1', 'h264': 'avc1',
+    'hvc1': 'hevc', 'hev1': 'hevc', 'hevc': 'hevc', 'h265': 'hevc',
+    'av01': 'av01', 'av1': 'av01',
+    'vp09': 'vp09', 'vp9': 'vp09', 'vp8': 'vp8',
+    'mp4v': 'mp4v', 'apcn': 'prores', 'apch': 'prores', 'prores': 'prores',
+    'mp4a': 'mp4a', 'aac': 'mp4a', 'opus': 'opus', 'vorbis': 'vorbis',
+    'mp3': 'mp3', 'ac-3': 'ac-3', 'ac3': 'ac-3', 'ec-3': 'ec-3', 'eac3': 'ec-3',
+    'flac': 'flac', 'alac': 'alac',
+}
+
+
+def codec_family(codec):
+    """
+    Map a codec string like 'avc1.64001F' or 'mp4a.40.2' to its family, or None if unknown.
+    """
+    if not codec or codec == 'none':
+        return None
+    return _CODEC_ALIASES.get(codec.lower().split('.')[0])
+
+
+def fits(container, vcodec=None, acodec=None):
+    """
+    Whether streams of these codec families can be copied into container as they are.
+    None means there is no such stream.
+    """
+    video_codecs, audio_codecs = CONTAINER_CODECS.get(container, ((), ()))
+    if vcodec is not None and video_codecs is not None and vcodec not in video_codecs:
+        return False
+    if acodec is not None and audio_codecs is not None and acodec not in audio_codecs:
+        return False
+    return True
+
+
+def _families(video_format, audio_format):
+    vcodec = codec_family(video_format.get('vcodec'))
+    acodec_source = audio_format if audio_format is not None else video_format
+    acodec = codec_family(acodec_source.get('acodec'))
+    has_audio = acodec_source.get('acodec') not in (None, 'none')
+    known = vcodec is not None and (acodec is not None or not has_audio)
+    return known, vcodec, acodec
+
+
+def plan_output(video_format, audio_format=None, container=DEFAULT_CONTAINER, strict=False):
+    """
+    Choose the container yt-dlp merges the streams into.
+
+    :param video_format: Chosen (video) format dict
+    :param audio_format: Audio format merged into it, None for a single stream
+    :param container: Preferred container extension
+    :param strict: The output must end up in container, see container_plan for the step after merging
+    :return: merge_output_format, or None to leave the choice to yt-dlp
+    """
+    known, vcodec, acodec = _families(video_format, audio_format)
+    if audio_format is None or not known:
+        # Nothing to merge, or yt-dlp picks a container that fits the stream extensions
+        return None
+    if fits(container, vcodec, acodec):
+        return container
+    if strict:
+        # Copy into Matroska first, container_plan then converts only what has to be
+        return 'mkv'
+    for fallback in FALLBACK_CONTAINERS:
+        if fits(fallback, vcodec, acodec):
+            return fallback
+    return 'mkv'
+
+
+def _stream_fits(container, codec, video):
+    # An unknown codec never fits a container that is picky about codecs
+    codecs = CONTAINER_CODECS.get(container, ((), ()))[0 if video else 1]
+    return codecs is None or codec_family(codec) in codecs
+
+
+def container_plan(info, container):
+    """
+    How to get a downloaded (and merged) file into container when it is required,
+    from the codecs the file really has.
+
+    :param info: yt-dlp info dict of the file, with requested_formats when merged
+    :return: None when the file is in container already, otherwise (yt-dlp postprocessor
+             key, extra ffmpeg output arguments): a remux when every stream fits, else a
+             conversion that copies the stream that fits and transcodes only the other
+    """
+    if info.get('ext') == container:
+        return None
+    formats = info.get('requested_formats') or [info]
+    # 'none' means there is no such stream, a missing codec is not known
+    vcodecs = [fmt.get('vcodec') for fmt in formats if fmt.get('vcodec') != 'none']
+    acodecs = [fmt.get('acodec') for fmt in formats if fmt.get('acodec') != 'none']
+    video_fits = all(_stream_fits(container, codec, True) for codec in vcodecs)
+    audio_fits = all(_stream_fits(container, codec, False) for codec in acodecs)
+    if video_fits and audio_fits:
+        return 'FFmpegVideoRemuxer', []
+    args = []
+    if vcodecs and video_fits:
+        args += ['-c:v', 'copy']
+    if acodecs and audio_fits:
+        args += ['-c:a', 'copy']
+    return 'FFmpegVideoConvertor', args
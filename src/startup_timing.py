@@ -0,0 +1,53 @@
+# startup_timing.py
+# Import this first in main.py: the clock starts when the module is loaded.
+import json
+import os
+import sys
+import time
+
+from utils import app_data_path
+
+
+class StartupTimer:
+    """
+    Record named startup milestones relative to the first import of this module
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        """
+        Record that a milestone was reached, once per name.
+        """
+        if not any(mark_name == name for mark_name, _ in self.marks):
+            self.marks.append((name, time.perf_counter() - self.start))
+
+    def report(self, version=None):
+        """
+        Return the milestones in milliseconds since start, in the order reached.
+        """
+        return {
+            'timestamp': round(time.time(), 3),
+            'version': version,
+            'python': sys.version.split()[0],
+            'marks_ms': {name: round(elapsed * 1000, 1) for name, elapsed in self.marks},
+        }
+
+    def write_report(self, version=None):
+        """
+        Append the report to startup_timing.jsonl in the app data folder so it
+        can be compared across releases. Set AVD_STARTUP_REPORT=1 to also print it.
+        """
+        report = self.report(version)
+        try:
+            with open(app_data_path("startup_timing.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(report) + "\n")
+        except OSError as e:
+            print(f"Could not write startup timing report: {e}", file=sys.stderr)
+        if os.environ.get('AVD_STARTUP_REPORT'):
+            print(json.dumps(report), file=sys.stderr)
+        return report
+
+
+startup_timer = StartupTimer()
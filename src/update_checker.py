@@ -1,80 +1,208 @@
 import os
 import sys
-import requests
-from packaging import version
-from PyQt5.QtWidgets import QMessageBox, QProgressDialog
-from PyQt5.QtCore import Qt, QTimer
+import json
+import time
+import hashlib
+# requests and packaging are imported where they are used, they are slow to load
+from PyQt5.QtWidgets import QMessageBox, QProgressDialog, QApplication
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QPalette, QColor
 
+from utils import app_data_path
+
+# Seconds between two update checks, and (connect, read) timeouts for one check
+CHECK_INTERVAL = 24 * 3600
+REQUEST_TIMEOUT = (3.05, 5)
+
+# Update download: read size bounds and minimum seconds between progress redraws
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 0.1
+
+
 class VersionChecker:
-    def __init__(self, current_version, api_url):
+    def __init__(self, current_version, api_url, cache_path=None, check_interval=CHECK_INTERVAL):
         self.current_version = current_version
         self.api_url = api_url
         self.update_info = None
+        self.cache_path = cache_path or app_data_path("update_check.json")
+        self.check_interval = check_interval
 
-    def check_for_updates(self):
+    def load_cache(self):
         """
-        Check for updates by calling the Next.js API endpoint
-        Returns: (bool, dict) - (update_available, update_info)
+        Load the last check result: checked_at, etag, last_modified and update_info
         """
         try:
-            response = requests.get(self.api_url)
-            if response.status_code == 200:
-                self.update_info = response.json()
-                latest_version = self.update_info.get('version')
-                
-                if latest_version and version.parse(latest_version) > version.parse(self.current_version):
-                    return True, self.update_info
-                
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            # Only trust answers about the endpoint we are asking now
+            if cache.get('api_url') == self.api_url:
+                return cache
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def save_cache(self, cache):
+        try:
+            cache['api_url'] = self.api_url
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"Could not save update check cache: {e}")
+
+    def is_newer(self, update_info):
+        from packaging import version
+
+        latest_version = (update_info or {}).get('version')
+        return bool(latest_version) and version.parse(latest_version) > version.parse(self.current_version)
+
+    def check_for_updates(self, force=False):
+        """
+        Check for updates by calling the Next.js API endpoint.
+        The answer is cached on disk and only re-validated once per check_interval,
+        using ETag / Last-Modified so an unchanged answer costs a 304.
+        Returns: (bool, dict) - (update_available, update_info)
+        """
+        if not self.api_url:
             return False, None
+
+        cache = self.load_cache()
+        now = time.time()
+        if not force and cache.get('update_info') is not None and now - cache.get('checked_at', 0) < self.check_interval:
+            self.update_info = cache['update_info']
+        else:
+            import requests
+
+            headers = {}
+            if cache.get('etag'):
+                headers['If-None-Match'] = cache['etag']
+            if cache.get('last_modified'):
+                headers['If-Modified-Since'] = cache['last_modified']
+
+            try:
+                response = requests.get(self.api_url, headers=headers, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 304 and cache.get('update_info') is not None:
+                    self.update_info = cache['update_info']
+                elif response.status_code == 200:
+                    self.update_info = response.json()
+                    cache['update_info'] = self.update_info
+                    cache['etag'] = response.headers.get('ETag')
+                    cache['last_modified'] = response.headers.get('Last-Modified')
+                else:
+                    return False, None
+                cache['checked_at'] = now
+                self.save_cache(cache)
+            except Exception as e:
+                print(f"Error checking for updates: {str(e)}")
+                return False, None
+
+        try:
+            if self.is_newer(self.update_info):
+                return True, self.update_info
         except Exception as e:
             print(f"Error checking for updates: {str(e)}")
-            return False, None
+        return False, None
 
-    def download_update(self, download_url, save_dir, progress_dialog):
+    def download_update(self, download_url, save_dir, progress_dialog, expected_sha256=None):
         """
-        Download the new version of the software with detailed progress tracking
+        Download the new version of the software with detailed progress tracking.
+        Data goes to a .part file that is resumed with an HTTP Range request after
+        a failure or cancel, is hashed while streaming, and is only renamed into
+        place once complete (and matching expected_sha256, when given).
         Args:
             download_url: URL to download the update from
             save_dir: Directory to save the downloaded file
             progress_dialog: QProgressDialog instance for showing progress
+            expected_sha256: Hex SHA-256 digest from the update API, if provided
         """
+        import requests
+
+        # Prepare filename
+        base_filename = "Any Video Url Downloader.exe"
+        base_name, extension = os.path.splitext(base_filename)
+        part_path = os.path.join(save_dir, base_filename + ".part")
+        meta_path = part_path + ".json"
+
         try:
+            # Resume only a partial file of the same URL, and only if the server copy did not change
+            meta = {}
+            if os.path.exists(part_path):
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    meta = {}
+                if meta.get('url') != download_url:
+                    os.remove(part_path)
+                    meta = {}
+            downloaded = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+            headers = {}
+            if downloaded:
+                headers['Range'] = f"bytes={downloaded}-"
+                validator = meta.get('etag') or meta.get('last_modified')
+                if validator:
+                    headers['If-Range'] = validator
+
             # Make a streaming request to get the file
-            response = requests.get(download_url, stream=True)
+            response = requests.get(download_url, stream=True, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 416:
+                # Stale or oversized partial file, start over
+                os.remove(part_path)
+                downloaded = 0
+                response = requests.get(download_url, stream=True, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()
-            
+
+            sha256 = hashlib.sha256()
+            if response.status_code == 206:
+                # Seed the hash with the bytes we already have
+                with open(part_path, 'rb') as f:
+                    for data in iter(lambda: f.read(MAX_CHUNK_SIZE), b''):
+                        sha256.update(data)
+                mode = 'ab'
+            else:
+                # Server sent the whole file
+                downloaded = 0
+                mode = 'wb'
+
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'url': download_url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }, f)
+
             # Get file size and set up progress dialog
-            total_size = int(response.headers.get('content-length', 0))
+            total_size = downloaded + int(response.headers.get('content-length', 0))
             progress_dialog.setMaximum(100)
             progress_dialog.setValue(0)
-            
-            # Prepare filename
-            base_filename = "Any Video Url Downloader.exe"
-            base_name, extension = os.path.splitext(base_filename)
-            
-            # Handle duplicate filenames
-            counter = 0
-            final_path = os.path.join(save_dir, base_filename)
-            while os.path.exists(final_path):
-                counter += 1
-                final_path = os.path.join(save_dir, f"{base_name} ({counter}){extension}")
-            
-            # Download with progress tracking
-            block_size = 1024  # 1 Kibibyte
-            downloaded = 0
-            
-            with open(final_path, 'wb') as f:
-                for data in response.iter_content(block_size):
-                    if progress_dialog.wasCanceled():
-                        f.close()
-                        os.remove(final_path)
-                        return None
-                        
+
+            # Download with progress tracking, growing the read size while reads are fast
+            chunk_size = MIN_CHUNK_SIZE
+            last_redraw = 0
+
+            with open(part_path, mode) as f:
+                while True:
+                    read_started = time.monotonic()
+                    data = response.raw.read(chunk_size, decode_content=True)
+                    if not data:
+                        break
+                    read_time = time.monotonic() - read_started
+                    if read_time < 0.05 and chunk_size < MAX_CHUNK_SIZE:
+                        chunk_size *= 2
+                    elif read_time > 0.5 and chunk_size > MIN_CHUNK_SIZE:
+                        chunk_size //= 2
+
                     downloaded += len(data)
                     f.write(data)
-                    
-                    # Update progress dialog
+                    sha256.update(data)
+
+                    # Redraw the progress dialog a few times per second at most
+                    now = time.monotonic()
+                    if now - last_redraw < PROGRESS_INTERVAL:
+                        continue
+                    last_redraw = now
+
                     if total_size > 0:
                         percent = int((downloaded / total_size) * 100)
                         downloaded_mb = downloaded / (1024 * 1024)
@@ -84,17 +212,37 @@ class VersionChecker:
                             f"({downloaded_mb:.1f} MB / {total_mb:.1f} MB)"
                         )
                         progress_dialog.setValue(percent)
-                    
-                    # Process events to keep UI responsive
-                    QTimer.singleShot(0, lambda: None)
-            
+
+                    # Process events to keep UI responsive and the cancel button working
+                    QApplication.processEvents()
+                    if progress_dialog.wasCanceled():
+                        # Keep the partial file, the next attempt resumes from it
+                        return None
+
+            if total_size > 0 and downloaded < total_size:
+                raise Exception(f"connection closed after {downloaded} of {total_size} bytes")
+
+            if expected_sha256 and sha256.hexdigest().lower() != expected_sha256.lower():
+                os.remove(part_path)
+                os.remove(meta_path)
+                raise Exception("checksum mismatch, the downloaded file was discarded")
+
+            # Handle duplicate filenames
+            counter = 0
+            final_path = os.path.join(save_dir, base_filename)
+            while os.path.exists(final_path):
+                counter += 1
+                final_path = os.path.join(save_dir, f"{base_name} ({counter}){extension}")
+
+            # Only a complete, verified file ever appears under the final name
+            os.replace(part_path, final_path)
+            try:
+                os.remove(meta_path)
+            except OSError:
+                pass
+            progress_dialog.setValue(100)
             return final_path
         except Exception as e:
-            if os.path.exists(final_path):
-                try:
-                    os.remove(final_path)
-                except:
-                    pass
             raise Exception(f"Failed to download update: {str(e)}")
 
 def set_dark_theme(dialog):
@@ -150,14 +298,43 @@ def set_dark_theme(dialog):
         }
     """)
 
+class UpdateCheckThread(QThread):
+    """
+    Background thread for the update check, so a slow network never blocks the UI
+    """
+    update_available = pyqtSignal(dict)
+
+    def __init__(self, version_checker):
+        super().__init__()
+        self.version_checker = version_checker
+
+    def run(self):
+        update_available, update_info = self.version_checker.check_for_updates()
+        if update_available and update_info:
+            self.update_available.emit(update_info)
+
+
 def check_and_update(main_window, current_version, api_url):
     """
-    Main function to check for updates and handle the update process
+    Main function to check for updates and handle the update process.
+    The check runs in the background, the user is only asked once a newer version is found.
+
+    :return: The started UpdateCheckThread, keep a reference to it while it runs
     """
     version_checker = VersionChecker(current_version, api_url)
-    update_available, update_info = version_checker.check_for_updates()
-    
-    if update_available and update_info:
+    check_thread = UpdateCheckThread(version_checker)
+    check_thread.update_available.connect(
+        lambda update_info: prompt_for_update(main_window, version_checker, update_info)
+    )
+    check_thread.start()
+    return check_thread
+
+
+def prompt_for_update(main_window, version_checker, update_info):
+    """
+    Ask the user to download a newer version and handle the download
+    """
+    if update_info:
         msg = QMessageBox(main_window)
         msg.setIcon(QMessageBox.Information)
         msg.setWindowTitle("Update Available")
@@ -190,7 +367,8 @@ def check_and_update(main_window, current_version, api_url):
                 downloaded_path = version_checker.download_update(
                     update_info['download_url'], 
                     download_dir,
-                    progress
+                    progress,
+                    expected_sha256=update_info.get('sha256')
                 )
                 
                 if downloaded_path:
@@ -222,5 +400,4 @@ def check_and_update(main_window, current_version, api_url):
                     main_window,
                     "Update Error",
                     f"Failed to download update: {str(e)}"
-                )
-    return update_available
\ No newline at end of file
+                )
\ No newline at end of file
@@ -1,6 +1,9 @@
 # utils.py
 import sys
 import os
+import re
+import sqlite3
+from contextlib import contextmanager
 
 def resource_path(relative_path):
     """
@@ -13,3 +16,55 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
 
     return os.path.join(base_path, relative_path)
+
+
+def sanitize_filename(filename):
+    """
+    Strip characters that are not allowed or not portable in file names
+    """
+    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = re.sub(r'[^\x00-\x7F]+', '', filename)
+    max_length = 100
+    if len(filename) > max_length:
+        filename = filename[:max_length]
+    filename = filename.strip('. ')
+    return filename or 'video'
+
+
+def strip_ansi_codes(text):
+    """
+    Remove ANSI color codes that yt-dlp adds to its error messages
+    """
+    return re.sub(r'\x1b\[[0-9;]*m', '', text)
+
+
+APP_NAME = "AnyVideoUrlDownloader"
+
+
+def app_data_path(*parts):
+    """
+    Get a path inside the per-user application data folder, creating the folder if needed
+    """
+    base_path = (
+        os.environ.get('APPDATA')
+        or os.environ.get('XDG_DATA_HOME')
+        or os.path.join(os.path.expanduser("~"), ".local", "share")
+    )
+    data_dir = os.path.join(base_path, APP_NAME)
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, *parts)
+
+
+@contextmanager
+def sqlite_connect(db_path):
+    """
+    Open a short-lived SQLite connection for one transaction: committed when the
+    block succeeds, rolled back when it raises, closed either way. One connection
+    per call keeps the stores that use it safe to use from any thread.
+    """
+    conn = sqlite3.connect(db_path, timeout=5)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,30 @@
+import sys
+
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.networking import Response
+from yt_dlp.utils import DownloadError
+
+from downloader_core import is_expired_url_error
+
+
+def _download_error(cause):
+    try:
+        raise cause
+    except Exception:
+        return DownloadError(f"ERROR: unable to download video data: {cause}", sys.exc_info())
+
+
+def _http_error(status):
+    return HTTPError(Response(None, 'http://example.com/v.mp4', {}, status=status))
+
+
+def test_expired_url_errors_ask_for_a_fresh_extraction():
+    assert is_expired_url_error(_download_error(_http_error(403)))
+    assert is_expired_url_error(_download_error(_http_error(410)))
+    assert is_expired_url_error(DownloadError("ERROR: [youtube] abc: The signed URL has expired"))
+
+
+def test_other_download_errors_are_not_retried():
+    assert not is_expired_url_error(_download_error(_http_error(404)))
+    assert not is_expired_url_error(_download_error(OSError(28, "No space left on device")))
+    assert not is_expired_url_error(DownloadError("ERROR: Requested format is not available"))
@@ -0,0 +1,42 @@
+import pytest
+
+from downloader_core import enhance_formats_with_audio
+from format_ranking import parse_policy, select_format
+
+
+DURATION = 600
+
+
+def _formats():
+    return enhance_formats_with_audio([
+        {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 130, 'tbr': 130},
+        {'format_id': '136', 'ext': 'mp4', 'vcodec': 'avc1.64001f', 'acodec': 'none', 'height': 720, 'fps': 30,
+         'tbr': 2300},
+        {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none', 'height': 1080, 'fps': 30,
+         'tbr': 4300},
+        {'format_id': '18', 'ext': 'mp4', 'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2', 'height': 360, 'fps': 30,
+         'tbr': 700},
+    ])
+
+
+def test_policy_prefers_merged_formats_with_ffmpeg():
+    assert select_format(_formats(), 'best-720p', DURATION)['format_id'] == '136'
+
+
+def test_policy_falls_back_to_mixed_format_without_ffmpeg():
+    assert select_format(_formats(), 'best-720p', DURATION, can_merge=False)['format_id'] == '18'
+
+
+def test_policy_without_ffmpeg_finds_nothing_when_every_format_needs_merging():
+    formats = [fmt for fmt in _formats() if fmt['format_id'] != '18']
+    assert select_format(formats, 'best', DURATION, can_merge=False) is None
+
+
+@pytest.mark.parametrize('text, max_bytes', [
+    ('fit:100', 100 * 1024 ** 2),
+    ('fit:100MB', 100 * 1024 ** 2),
+    ('fit:1.5g', 1.5 * 1024 ** 3),
+    ('fit:500kb', 500 * 1024),
+])
+def test_size_budget_without_unit_is_megabytes(text, max_bytes):
+    assert parse_policy(text).max_bytes == max_bytes
@@ -0,0 +1,31 @@
+from remux import container_plan, plan_output
+
+
+VP9 = {'format_id': '248', 'ext': 'webm', 'vcodec': 'vp9', 'acodec': 'none'}
+AVC = {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1.640028', 'acodec': 'none'}
+AAC = {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2'}
+OPUS = {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus'}
+
+
+def test_strict_merge_copies_into_matroska_when_the_codecs_dont_fit():
+    assert plan_output(VP9, AAC, 'webm', strict=True) == 'mkv'
+    assert plan_output(VP9, OPUS, 'webm', strict=True) == 'webm'
+
+
+def test_container_plan_remuxes_when_every_stream_fits():
+    info = {'ext': 'webm', 'requested_formats': [VP9, OPUS]}
+    assert container_plan(info, 'mp4') == ('FFmpegVideoRemuxer', [])
+    assert container_plan(info, 'webm') is None
+
+
+def test_container_plan_transcodes_only_the_stream_that_does_not_fit():
+    assert container_plan({'ext': 'mkv', 'requested_formats': [VP9, AAC]}, 'webm') == \
+        ('FFmpegVideoConvertor', ['-c:v', 'copy'])
+    assert container_plan({'ext': 'mkv', 'requested_formats': [AVC, OPUS]}, 'webm') == \
+        ('FFmpegVideoConvertor', ['-c:a', 'copy'])
+    assert container_plan({'ext': 'mp4', 'requested_formats': [AVC, AAC]}, 'webm') == ('FFmpegVideoConvertor', [])
+
+
+def test_container_plan_reads_single_stream_codecs_from_the_info():
+    info = {'ext': 'mp4', 'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2'}
+    assert container_plan(info, 'mov') == ('FFmpegVideoRemuxer', [])